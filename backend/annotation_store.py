@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import itertools
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_PATH = Path(__file__).parent / "annotations.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    filename TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    metadata TEXT,
+    message_index INTEGER,
+    note TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    duplicate_of TEXT,
+    seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS annotations_status ON annotations(status, updated_at);
+"""
+
+# Columns added since the first schema, with the script that adds each
+MIGRATIONS = {
+    # Kept in the note as "duplicate of X" before
+    "duplicate_of": """
+        ALTER TABLE annotations ADD COLUMN duplicate_of TEXT;
+        UPDATE annotations SET duplicate_of = substr(note, 14), note = NULL WHERE note LIKE 'duplicate of %';
+    """,
+    "seq": """
+        ALTER TABLE annotations ADD COLUMN seq INTEGER;
+        WITH ordered AS (SELECT filename, ROW_NUMBER() OVER (ORDER BY updated_at, filename) AS n FROM annotations)
+        UPDATE annotations SET seq = (SELECT n FROM ordered WHERE ordered.filename = annotations.filename);
+    """,
+}
+
+# Every write takes the next change number. Writers run BEGIN IMMEDIATE, so
+# it's assigned under the database write lock: seq order is commit order
+# across all processes, and a reader that sees seq N has seen every row
+# changed before it. `updated_at` is taken when a write is queued and gives
+# no such guarantee.
+NEXT_SEQ = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM annotations)"
+
+UPSERT = f"""
+INSERT INTO annotations (filename, status, metadata, message_index, note, created_at, updated_at, duplicate_of, seq)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, {NEXT_SEQ})
+ON CONFLICT(filename) DO UPDATE SET
+    status = excluded.status,
+    metadata = excluded.metadata,
+    message_index = COALESCE(excluded.message_index, annotations.message_index),
+    note = COALESCE(excluded.note, annotations.note),
+    updated_at = excluded.updated_at,
+    duplicate_of = excluded.duplicate_of,
+    seq = excluded.seq
+"""
+
+# Note on rejections imported from zero-byte .json files, the old way of
+# recording a skip. d.py reviews exactly these; UI rejections have no note
+LEGACY_EMPTY_JSON = "legacy-empty-json"
+
+COLUMNS = ("filename", "status", "metadata", "message_index", "note", "created_at", "updated_at", "duplicate_of", "seq")
+
+_STOP = object()
+
+# Failed write tickets remembered for flush(tickets); older ones are dropped
+MAX_FAILURES = 4096
+
+
+def connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    for column, script in MIGRATIONS.items():
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(annotations)")}
+        if column in columns: continue
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE; {script} COMMIT;")
+        except sqlite3.OperationalError:
+            if conn.in_transaction: conn.rollback()  # another process migrated it first
+    conn.execute("CREATE INDEX IF NOT EXISTS annotations_seq ON annotations(seq)")
+    return conn
+
+
+class AnnotationStore:
+    """SQLite (WAL) store for review decisions, replacing the annotated/ dir.
+
+    Writes go through a single writer thread that drains everything queued
+    while the previous transaction was committing into the next one, so a
+    burst of `/action` calls costs one fsync rather than one file each. Reads
+    see queued writes only after `flush()`.
+
+    Each write returns a ticket. If its transaction fails, the writes are
+    retried one per transaction, and any that still fail are recorded
+    against their ticket, so `flush(tickets)` raises for exactly the
+    caller whose decision was not stored.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = connect(self.path)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._tickets = itertools.count(1)
+        self._failures = OrderedDict()  # ticket -> sqlite3.Error
+        self._writer = threading.Thread(target=self._write_loop, name="annotation-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- Writes ---
+    def set(self, filename: str, status: str, metadata=None, message_index: Optional[int] = None, note: Optional[str] = None,
+            duplicate_of: Optional[str] = None):
+        """Queues a decision and returns its ticket; `duplicate_of` names the screenshot it was copied from."""
+        now = time.time()
+        blob = json.dumps(metadata) if metadata is not None else None
+        return self._put(UPSERT, (filename, status, blob, message_index, note, now, now, duplicate_of))
+
+    def set_note(self, filename: str, note: str):
+        return self._put(f"UPDATE annotations SET note = ?, seq = {NEXT_SEQ} WHERE filename = ?", (note, filename))
+
+    def _put(self, sql, params) -> int:
+        ticket = next(self._tickets)
+        self._queue.put((ticket, sql, params))
+        return ticket
+
+    def pending_writes(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, tickets=()):
+        """Blocks until every queued write is committed or has failed.
+
+        Raises the error of the first write in `tickets` that was not stored.
+        """
+        self._queue.join()
+        with self._lock:
+            errors = [self._failures.pop(t) for t in tickets if t in self._failures]
+        if errors: raise errors[0]
+
+    def close(self):
+        if not self._writer.is_alive(): return
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            writes = [item for item in batch if item is not _STOP]
+            try:
+                self._commit(conn, writes)
+            except sqlite3.Error as e:
+                print(f"Failed to commit {len(writes)} annotation writes, retrying one by one: {e}")
+                for write in writes:
+                    try:
+                        self._commit(conn, [write])
+                    except sqlite3.Error as e:
+                        print(f"Annotation write failed: {e}")
+                        with self._lock:
+                            self._failures[write[0]] = e
+                            while len(self._failures) > MAX_FAILURES:
+                                self._failures.popitem(last=False)
+            for _ in batch:
+                self._queue.task_done()
+            if stop: break
+        conn.close()
+
+    @staticmethod
+    def _commit(conn, writes):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for _, sql, params in writes:
+                conn.execute(sql, params)
+
+    # --- Reads ---
+    def get(self, filename: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM annotations WHERE filename = ?", (filename,)).fetchone()
+        return _row(row) if row else None
+
+    def iter(self, status: Optional[str] = None, since: Optional[int] = None):
+        """Yields annotations oldest first, optionally only one status.
+
+        With `since`, yields only rows changed after that `seq`, in seq
+        (commit) order; see `last_seq`.
+        """
+        sql = f"SELECT {', '.join(COLUMNS)} FROM annotations"
+        where = []
+        params = []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if since is not None:
+            where.append("seq > ?")
+            params.append(since)
+        if where: sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq" if since is not None else " ORDER BY updated_at, filename"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield _row(row)
+
+    def last_seq(self) -> int:
+        """Change number of the latest committed write, 0 for an empty store."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM annotations").fetchone()[0]
+
+    def changes(self, since: int) -> list:
+        """[(seq, filename, status)] committed after `since`, in seq order; cheap, no metadata."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, filename, status FROM annotations WHERE seq > ? ORDER BY seq", (since,)
+            ).fetchall()
+
+    def status_map(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT filename, status FROM annotations"))
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM annotations GROUP BY status"))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM annotations LIMIT 1").fetchone() is None
+
+    # --- Migration ---
+    def import_dir(self, annotated_dir) -> int:
+        """Loads the old one-file-per-decision layout; mtimes become timestamps."""
+        rows = {}
+        for entry in os.scandir(annotated_dir):
+            name = entry.name
+            if name.endswith(".json"):
+                filename = name[:-5]
+            elif name.endswith(".skipped"):
+                filename = name[:-8]
+                if filename in rows: continue  # .json wins
+            else:
+                continue
+
+            mtime = entry.stat().st_mtime
+            with open(entry.path, "r") as f:
+                text = f.read()
+            metadata = None
+            if name.endswith(".json") and text.strip():
+                try:
+                    metadata = json.loads(text)
+                except ValueError:
+                    pass  # d.py wrote reviewer notes (e.g. "ood") into skip .json files
+            if metadata is not None:
+                rows[filename] = (filename, "accepted", json.dumps(metadata), None, None, mtime, mtime, None)
+            else:
+                # Any text in a .json or .skipped file is a reviewer note
+                note = text.strip() or (LEGACY_EMPTY_JSON if name.endswith(".json") else None)
+                rows[filename] = (filename, "rejected", None, None, note, mtime, mtime, None)
+
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            # Oldest first, so seq follows the original decision order
+            self._conn.executemany(UPSERT, sorted(rows.values(), key=lambda row: (row[6], row[0])))
+        return len(rows)
+
+    def export_dir(self, annotated_dir) -> int:
+        """Writes the store back out in the old annotated/ layout."""
+        self.flush()
+        annotated_dir = Path(annotated_dir)
+        annotated_dir.mkdir(parents=True, exist_ok=True)
+        n = 0
+        for row in self.iter():
+            if row["status"] == "accepted":
+                path = annotated_dir / f"{row['filename']}.json"
+                with open(path, "w") as f:
+                    json.dump(row["metadata"], f, indent=2)
+            elif row["note"] == LEGACY_EMPTY_JSON:
+                path = annotated_dir / f"{row['filename']}.json"
+                path.write_text("")
+            else:
+                path = annotated_dir / f"{row['filename']}.skipped"
+                path.write_text(f"{row['note']}\n" if row["note"] else "")
+            os.utime(path, (row["updated_at"], row["updated_at"]))
+            n += 1
+        return n
+
+
+def _row(row) -> dict:
+    data = dict(zip(COLUMNS, row))
+    if data["metadata"] is not None:
+        data["metadata"] = json.loads(data["metadata"])
+    return data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("usage: python annotation_store.py import|export [annotated_dir] [db_path]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    directory = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(__file__).parent / "annotated"
+    store = AnnotationStore(sys.argv[3] if len(sys.argv) > 3 else DEFAULT_PATH)
+    if command == "import":
+        print(f"Imported {store.import_dir(directory)} annotations from {directory}")
+    else:
+        print(f"Exported {store.export_dir(directory)} annotations to {directory}")
+    store.close()
@@ -0,0 +1,231 @@
+import re
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from time import perf_counter
+
+import numpy as np
+from dateutil import parser as date_parser
+
+BUFFERS_DIR = Path(__file__).parent / "buffers"
+
+
+# --- Reference implementations: the code each fast path replaced ---
+def reference_decode_text(data):
+    """The one-findall-per-field loop `decoding.decode_text` replaced."""
+    data = data.lower()
+
+    patterns = {
+        "sender": r"(?m)^\s*(?:sender|s)\s*[:\-]?\s*(.*)",
+        "receiver": r"(?m)^\s*(?:rec(?:ei|ie)ver|r)\s*[:\-]?\s*(.*)",
+        "date": r"(?m)^\s*(?:date|d)\s*[:\-]?\s*(.*)"
+    }
+
+    results = {}
+    for key, pattern in patterns.items():
+        matches = re.findall(pattern, data)
+        if matches:
+            val = matches[-1].strip().strip('<>').strip()
+
+            if key == "date" and "," in val:
+                val = val.split(',')[-1].strip()
+
+            results[key] = val
+        else:
+            results[key] = None
+
+    return results
+
+
+def reference_parse_date_value(raw_val, epoch_context):
+    """The unmemoized `dates.parse_date_value`: dateutil on every call."""
+    context_dt = datetime.fromtimestamp(epoch_context)
+    context_date = context_dt.date()
+
+    raw_val = raw_val.lower().strip()
+
+    if "today" in raw_val:
+        return context_date
+
+    normalized = re.sub(r"[–—\.]", "/", raw_val)
+    normalized = re.sub(r"(\d+)(st|nd|rd|th)", r"\1", normalized)
+    normalized = re.sub(r"\(.*?\)", "", normalized).strip()
+
+    possibilities = []
+
+    for dayfirst in (True, False):
+        try:
+            dt = date_parser.parse(
+                normalized,
+                dayfirst=dayfirst,
+                default=context_dt
+            )
+        except (ValueError, OverflowError, TypeError):
+            continue
+
+        parsed_date = dt.date()
+
+        delta_days = abs((parsed_date - context_date).days)
+
+        if delta_days > 1:
+            try:
+                parsed_date = parsed_date.replace(year=context_date.year)
+            except ValueError:
+                parsed_date = parsed_date.replace(
+                    year=context_date.year,
+                    day=28
+                )
+
+        possibilities.append(parsed_date)
+
+    if not possibilities:
+        return None
+
+    best = min(
+        possibilities,
+        key=lambda d: abs((d - context_date).days)
+    )
+
+    return best
+
+
+def reference_history(trades):
+    """The full-rebuild loop xx.py/xxx.py used before `discovery.DiscoveryHistogram`."""
+    from discovery import LABELS, get_bin
+    running = Counter()
+    history = {label: [] for label in LABELS}
+    for item_ids in trades:
+        for iid in item_ids:
+            running[iid] += 1
+        snapshot = Counter(get_bin(count) for count in running.values())
+        for label in LABELS:
+            history[label].append(snapshot[label])
+    return history
+
+
+# --- Checks: each benchmarks a fast path and returns how many results differ from its reference ---
+def check_decoding(args):
+    from ingest import load_messages
+    from decoding import decode_batch
+
+    texts = [message[0] for message in load_messages(args.buffers)] * args.repeat
+    if not texts:
+        print(f"No messages in {args.buffers}")
+        return 1
+    print(f"{len(texts)} messages")
+
+    def timed(label, fn):
+        s = perf_counter()
+        out = fn()
+        elapsed = perf_counter() - s
+        print(f"  {label:<24} {len(texts) / elapsed:>12,.0f} msgs/s")
+        return out
+
+    reference = timed("reference (3x findall)", lambda: [reference_decode_text(t) for t in texts])
+    single = timed("single pass", lambda: decode_batch(texts))
+    pooled = timed(f"single pass x{args.workers}", lambda: decode_batch(texts, workers=args.workers))
+
+    mismatches = sum(1 for a, b in zip(reference, single) if a != b)
+    print(f"Mismatches vs reference: {mismatches}")
+    return mismatches + (pooled != single)
+
+
+def check_dates(args):
+    from ingest import load_messages
+    from decoding import decode_messages
+    from dates import parse_date_value, _parse_normalized
+
+    messages = load_messages(args.buffers)
+    pairs = [
+        (info["date"], message[1])
+        for message, info in zip(messages, decode_messages(messages))
+        if info["date"]
+    ]
+    if not pairs:
+        print(f"No dated messages in {args.buffers}")
+        return 1
+    print(f"{len(pairs)} dated messages, {len({raw for raw, _ in pairs})} distinct strings")
+
+    def timed(label, fn):
+        s = perf_counter()
+        out = [fn(raw, epoch) for raw, epoch in pairs]
+        print(f"  {label:<16} {len(pairs) / (perf_counter() - s):>12,.0f} parses/s")
+        return out
+
+    reference = timed("reference", reference_parse_date_value)
+    _parse_normalized.cache_clear()
+    cold = timed("fast (cold)", parse_date_value)
+    timed("fast (warm)", parse_date_value)
+    info = _parse_normalized.cache_info()
+    print(f"  memo: {info.hits} hits, {info.misses} misses")
+
+    mismatches = [(raw, a, b) for (raw, _), a, b in zip(pairs, reference, cold) if a != b]
+    for raw, a, b in mismatches[:20]:
+        print(f"  MISMATCH {raw!r}: reference={a} fast={b}")
+    print(f"Mismatches vs reference: {len(mismatches)}")
+    return len(mismatches)
+
+
+def check_discovery(args):
+    from discovery import LABELS, DiscoveryHistogram, history_from_items
+
+    rng = np.random.default_rng(0)
+    # Zipf-ish popularity, like real trades: a few items everywhere, a long tail
+    sizes = rng.integers(1, 9, args.trades)
+    ids = rng.zipf(1.3, sizes.sum()) % args.items
+    trades = [set(chunk.tolist()) for chunk in np.split(ids, np.cumsum(sizes)[:-1])]
+
+    s = perf_counter()
+    histogram = DiscoveryHistogram().add_trades(trades)
+    elapsed = perf_counter() - s
+    print(f"{args.trades} trades, {len(histogram.counts)} items: {elapsed * 1000:.0f}ms ({args.trades / elapsed:,.0f} trades/s)")
+
+    trade_of = np.repeat(np.arange(args.trades), [len(t) for t in trades])
+    flat = np.fromiter((iid for t in trades for iid in t), dtype=np.int64, count=len(trade_of))
+    s = perf_counter()
+    vectorized = history_from_items(trade_of, flat, args.trades)
+    elapsed = perf_counter() - s
+    print(f"Vectorized from item rows: {elapsed * 1000:.0f}ms, matches: {np.array_equal(vectorized, histogram.history)}")
+
+    check = trades[:args.check]
+    s = perf_counter()
+    reference = reference_history(check)
+    print(f"Full rebuild on first {len(check)} trades: {(perf_counter() - s) * 1000:.0f}ms")
+
+    series = DiscoveryHistogram().add_trades(check).series()
+    mismatched = [label for label in LABELS if series[label].tolist() != reference[label]]
+    print(f"Mismatched bins vs reference: {mismatched or 'none'}")
+    return len(mismatched) + (not np.array_equal(vectorized, histogram.history))
+
+
+CHECKS = {"decoding": check_decoding, "dates": check_dates, "discovery": check_discovery}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast paths and check them against the code they replaced")
+    parser.add_argument("checks", nargs="*", help=f"any of {', '.join(CHECKS)} (default: all)")
+    parser.add_argument("--buffers", type=Path, default=BUFFERS_DIR)
+    parser.add_argument("--workers", type=int, default=4, help="decoding: pool size")
+    parser.add_argument("--repeat", type=int, default=1, help="decoding: replicate the corpus to get stable timings")
+    parser.add_argument("--trades", type=int, default=200_000, help="discovery: synthetic trades")
+    parser.add_argument("--items", type=int, default=20_000, help="discovery: distinct synthetic items")
+    parser.add_argument("--check", type=int, default=3_000, help="discovery: compare this many trades against the full rebuild")
+    args = parser.parse_args()
+    unknown = set(args.checks) - set(CHECKS)
+    if unknown: parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    failed = []
+    for name in args.checks or CHECKS:
+        print(f"\n{name}")
+        if CHECKS[name](args): failed.append(name)
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        return 1
+    print("\nAll fast paths match their reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
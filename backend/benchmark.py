@@ -0,0 +1,204 @@
+import sys
+import json
+import random
+import argparse
+import platform
+from pathlib import Path
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent
+MEDIA_DIR = BACKEND_DIR / "media"
+FIXTURES_DIR = BACKEND_DIR / "cache" / "bench_fixtures"
+BASELINE_PATH = BACKEND_DIR / "benchmark_baseline.json"
+
+# Typical screenshot sizes seen in the buffers
+FIXTURE_SIZES = [(1920, 1080), (1280, 720), (1170, 2532), (828, 1792), (2560, 1440)]
+# A corpus where more than this fraction fails to extract is measuring errors, not extraction
+MAX_ERROR_RATE = 0.5
+
+
+def distribution(latencies) -> dict:
+    """Latency summary in milliseconds."""
+    if not latencies: return {"n": 0}
+    arr = np.array(latencies) * 1000
+    return {
+        "n": int(arr.size),
+        "mean": round(float(arr.mean()), 3),
+        "median": round(float(np.median(arr)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+# --- Worker-side ---
+def _time_extract(path):
+    import proofreader
+    s = perf_counter()
+    try:
+        proofreader.get_trade_data(path)
+    except Exception:
+        return None
+    return perf_counter() - s
+
+
+def _latency_run(paths, passes):
+    """Runs in a fresh process so the first pass really is cold."""
+    s = perf_counter()
+    import proofreader  # noqa: F401
+    import_s = perf_counter() - s
+
+    cold = [t for t in map(_time_extract, paths) if t is not None]
+    warm = []
+    for _ in range(passes):
+        warm += [t for t in map(_time_extract, paths) if t is not None]
+    errors = len(paths) - len(cold)
+    return import_s, cold, warm, errors
+
+
+# --- Corpora ---
+def corpus_paths(limit=None):
+    from annotation_store import AnnotationStore
+    store = AnnotationStore()
+    paths = [str(MEDIA_DIR / row["filename"]) for row in store.iter("accepted")]
+    paths = [p for p in paths if Path(p).exists()]
+    return paths[:limit] if limit else paths
+
+
+def synthetic_paths(count=10):
+    """Deterministic screenshot-sized images; generated once and reused."""
+    from PIL import Image, ImageDraw
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        path = FIXTURES_DIR / f"fixture_{i}.png"
+        if not path.exists():
+            width, height = FIXTURE_SIZES[i % len(FIXTURE_SIZES)]
+            img = Image.new("RGB", (width, height), (24, 24, 28))
+            draw = ImageDraw.Draw(img)
+            for _ in range(40):
+                x, y = rng.randrange(width), rng.randrange(height)
+                w, h = rng.randrange(40, 300), rng.randrange(40, 300)
+                color = tuple(rng.randrange(256) for _ in range(3))
+                draw.rectangle([x, y, x + w, y + h], fill=color)
+            img.save(path)
+        paths.append(str(path))
+    return paths
+
+
+# --- Benchmarks ---
+def bench_latency(paths, passes):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        import_s, cold, warm, errors = pool.submit(_latency_run, paths, passes).result()
+    return {
+        "import_s": round(import_s, 3),
+        "errors": errors,
+        "cold": distribution(cold),
+        "warm": distribution(warm),
+    }
+
+
+def bench_throughput(paths, max_workers):
+    """Successful extractions per second, and failed ones, by worker count."""
+    results, errors = {}, {}
+    for workers in range(1, max_workers + 1):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Warm every worker before timing
+            list(pool.map(_time_extract, [paths[0]] * workers * 2))
+            s = perf_counter()
+            times = list(pool.map(_time_extract, paths, chunksize=max(1, len(paths) // (workers * 4))))
+            elapsed = perf_counter() - s
+        ok = sum(t is not None for t in times)
+        results[str(workers)] = round(ok / elapsed, 2)
+        errors[str(workers)] = len(paths) - ok
+        print(f"  {workers} workers: {results[str(workers)]} images/s ({errors[str(workers)]} errors)")
+    return results, errors
+
+
+def compare(current, baseline, threshold) -> list:
+    """Regressions worse than `threshold` (a fraction) versus the baseline."""
+    regressions = []
+    for corpus, result in current["corpora"].items():
+        base = baseline.get("corpora", {}).get(corpus)
+        if not base: continue
+        for stat in ("median", "p95"):
+            old, new = base["warm"].get(stat), result["warm"].get(stat)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{corpus} warm {stat}: {old}ms -> {new}ms")
+        for workers, old in base.get("throughput", {}).items():
+            new = result.get("throughput", {}).get(workers)
+            if new and new < old * (1 - threshold):
+                regressions.append(f"{corpus} throughput @{workers}: {old}/s -> {new}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput benchmark for proofreader.get_trade_data")
+    parser.add_argument("--corpus", choices=["annotated", "synthetic", "both"], default="both")
+    parser.add_argument("--limit", type=int, default=200, help="max annotated images to use")
+    parser.add_argument("--fixtures", type=int, default=10, help="number of synthetic images")
+    parser.add_argument("--passes", type=int, default=3, help="warm passes after the cold one")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before failing")
+    parser.add_argument("--output", type=Path, help="also write this run's results here")
+    args = parser.parse_args()
+
+    from cv_cache import proofreader_version
+    corpora = {}
+    if args.corpus in ("annotated", "both"): corpora["annotated"] = corpus_paths(args.limit)
+    if args.corpus in ("synthetic", "both"): corpora["synthetic"] = synthetic_paths(args.fixtures)
+
+    current = {
+        "proofreader_version": proofreader_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpora": {},
+    }
+    for name, paths in corpora.items():
+        if not paths:
+            print(f"Skipping {name}: no images")
+            continue
+        print(f"\n{name}: {len(paths)} images")
+        result = bench_latency(paths, args.passes)
+        print(f"  import {result['import_s']}s | cold {result['cold']} | warm {result['warm']}")
+        result["throughput"], result["throughput_errors"] = bench_throughput(paths, args.max_workers)
+        current["corpora"][name] = result
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    failing = [f"{name}: {result['errors']}/{len(corpora[name])} images failed to extract"
+               for name, result in current["corpora"].items() if result["errors"] > len(corpora[name]) * MAX_ERROR_RATE]
+    if failing:
+        print(f"\nTOO MANY ERRORS (> {MAX_ERROR_RATE:.0%}), not comparing or saving a baseline:")
+        for line in failing:
+            print("  ", line)
+        return 1
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(current, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        print(f"\nREGRESSIONS (> {args.threshold:.0%}):")
+        for line in regressions:
+            print("  ", line)
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
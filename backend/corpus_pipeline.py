@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from collections import deque
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+import cv_cache
+from discovery import trade_item_ids
+from phash import PerceptualIndex
+from trade_index import TradeIndex
+
+ITEMS_PATH = cv_cache.CACHE_DIR / "trade_items.jsonl"
+WORKERS = int(os.environ.get("VETO_CORPUS_WORKERS", os.cpu_count() or 1))
+
+
+def extract_items(job):
+    """Runs in a worker process: one trade's sorted item ids, or its error."""
+    message_index, filename, path = job
+    try:
+        items = sorted(trade_item_ids(cv_cache.get_trade_data(path)), key=str)
+        return {"message_index": message_index, "filename": filename, "items": items, "error": None}
+    except Exception as e:
+        return {"message_index": message_index, "filename": filename, "items": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def read_records(path=ITEMS_PATH, version=None) -> dict:
+    """{message_index: record} from the intermediate file, for `version` only.
+
+    A torn last line (the run was killed mid-write) and records from another
+    proofreader version are dropped. Later lines win over earlier ones.
+    """
+    version = version or cv_cache.proofreader_version()
+    records = {}
+    path = Path(path)
+    if not path.exists(): return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("version") == version:
+                records[record["message_index"]] = record
+    return records
+
+
+def load_item_sets(path=ITEMS_PATH, version=None, skip=(), messages=None) -> list:
+    """Per-trade item sets in message order, skipping trades CV failed on.
+
+    Each trade counts once: message indices in `skip` (e.g. `TradeIndex`
+    duplicates) and records copied from a reposted screenshot
+    (`duplicate_of`) are left out, as xx.py does for copied decisions. With
+    `messages`, records whose screenshot no longer matches the message at
+    their index (the buffers changed since they were written) are dropped.
+    """
+    records = read_records(path, version)
+    if messages is not None:
+        records = {i: r for i, r in records.items() if _matches(r, messages, i)}
+    return [
+        set(records[i]["items"]) for i in sorted(records)
+        if records[i]["items"] is not None and i not in skip and not records[i].get("duplicate_of")
+    ]
+
+
+def _matches(record, messages, index) -> bool:
+    return index < len(messages) and bool(messages[index][2]) and messages[index][2][0] == record["filename"]
+
+
+class CorpusPipeline:
+    """Runs CV over every buffered trade into a resumable JSONL intermediate.
+
+    Jobs fan out over a process pool but results are written back strictly in
+    message order, one flushed line each, so the file is always a valid
+    checkpoint: a restarted run re-reads it and only extracts what's missing.
+    Failures are logged and recorded too, and only retried with
+    `retry_errors`. Graphing scripts read the item sets back with
+    `load_item_sets` and never touch CV.
+
+    With a `phash.PerceptualIndex`, a trade whose screenshot is byte-for-byte
+    a copy of one already extracted copies that trade's items (recorded as
+    `duplicate_of`) instead of running CV again.
+    """
+
+    def __init__(self, media_dir, path=ITEMS_PATH, workers=WORKERS, window=None, version=None, phash=None):
+        self.media_dir = Path(media_dir)
+        self.path = Path(path)
+        self.workers = max(1, workers)
+        # Enough jobs in flight to keep every worker busy while the head is slow
+        self.window = window or self.workers * 4
+        self.version = version or cv_cache.proofreader_version()
+        self.phash = phash
+
+    def jobs(self, messages, records, retry_errors=False, skip=()):
+        jobs = []
+        missing = 0
+        for index, message in enumerate(messages):
+            if not message[2] or index in skip: continue
+            filename = message[2][0]
+            record = records.get(index)
+            # Records are keyed by message index, so one written before the
+            # buffers changed may belong to another screenshot
+            if record is not None and record["filename"] == filename and (record["error"] is None or not retry_errors): continue
+            path = self.media_dir / filename
+            if not path.exists():
+                # Not downloaded yet; a later run picks it up
+                missing += 1
+                continue
+            jobs.append((index, filename, str(path)))
+        return jobs, missing
+
+    def run(self, messages, retry_errors=False, on_start=None, on_record=None, skip=()) -> dict:
+        """Extracts every trade not yet in the file; returns run counts.
+
+        Message indices in `skip` are not extracted. `on_start(job_count)` is
+        called once the checkpoint is read and `on_record(record)` for each
+        trade as it's written.
+        """
+        start = perf_counter()
+        records = self._open()
+        jobs, missing = self.jobs(messages, records, retry_errors, skip)
+        redo = {job[0] for job in jobs}
+        done = sum(1 for i, r in records.items() if i not in redo and _matches(r, messages, i))
+        stats = {"total": done + len(jobs), "done": done, "extracted": 0, "errors": 0, "missing_images": missing}
+        if on_start: on_start(len(jobs))
+
+        sources = self._duplicate_sources(jobs, records) if self.phash else {}
+        stats["duplicates"] = len(sources)
+        results = self._results([job for job in jobs if job[0] not in sources])
+        items = {r["filename"]: r["items"] for r in records.values() if r["error"] is None}
+
+        with open(self.path, "a", encoding="utf-8") as out:
+            for index, filename, _ in jobs:
+                source = sources.get(index)
+                if source is None:
+                    record = next(results)
+                    if record["error"] is None: items[filename] = record["items"]
+                else:
+                    # The source is earlier in message order, so it's already written
+                    record = {"message_index": index, "filename": filename, "items": items.get(source), "error": None, "duplicate_of": source}
+                    if record["items"] is None: record["error"] = f"duplicate of {source}, which failed"
+                record["version"] = self.version
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+                stats["extracted"] += 1
+                if record["error"]:
+                    stats["errors"] += 1
+                    print(f"CV failed on {record['filename']}: {record['error']}", file=sys.stderr)
+                if on_record: on_record(record)
+
+        stats["elapsed_s"] = round(perf_counter() - start, 3)
+        return stats
+
+    def _duplicate_sources(self, jobs, records) -> dict:
+        """{message_index: filename to copy items from} for jobs that repeat earlier trades."""
+        self.phash.update([filename for _, filename, _ in jobs])
+        known = {r["filename"] for r in records.values() if r["error"] is None}
+        sources = {}
+        for index, filename, _ in jobs:
+            if filename in known:
+                sources[index] = filename
+                continue
+            source = next((other for other in self.phash.identical(filename) if other in known), None)
+            if source is None:
+                known.add(filename)  # extracted in this run; later copies reuse it
+            else:
+                sources[index] = source
+        return sources
+
+    def _results(self, jobs):
+        # Bounded submission with in-order draining: output order and memory
+        # stay fixed no matter how far ahead the pool gets
+        if self.workers == 1 or len(jobs) <= 1:
+            yield from map(extract_items, jobs)
+            return
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        jobs = iter(jobs)
+        try:
+            for job in jobs:
+                pending.append(pool.submit(extract_items, job))
+                if len(pending) >= self.window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _open(self) -> dict:
+        """Loads finished records, compacting the file if anything was dropped."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        records = read_records(self.path, self.version)
+        if not self.path.exists(): return records
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data.count(b"\n") != len(records) or not data.endswith(b"\n"):
+            # Stale versions, superseded retries or a torn last line
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for index in sorted(records):
+                    f.write(json.dumps(records[index]) + "\n")
+            os.replace(tmp, self.path)
+        return records
+
+
+def main():
+    from ingest import load_messages
+
+    parser = argparse.ArgumentParser(description="Extract per-trade item sets for every buffered trade")
+    parser.add_argument("--buffers", type=Path, default=Path(__file__).parent / "buffers")
+    parser.add_argument("--media", type=Path, default=Path(__file__).parent / "media")
+    parser.add_argument("--output", type=Path, default=ITEMS_PATH)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--retry-errors", action="store_true")
+    parser.add_argument("--no-dedupe", action="store_true", help="run CV on identical reposted screenshots too")
+    args = parser.parse_args()
+
+    messages = load_messages(args.buffers)
+    phash = None if args.no_dedupe else PerceptualIndex(args.media)
+    skip = set() if args.no_dedupe else TradeIndex(args.media).add(messages)
+    stats = CorpusPipeline(args.media, args.output, args.workers, phash=phash).run(messages, args.retry_errors, skip=skip)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from functools import lru_cache
+from typing import Optional
+from collections import OrderedDict
+from importlib import metadata as importlib_metadata
+
+import proofreader
+
+CACHE_DIR = Path(__file__).parent / "cache"
+CACHE_MAX_BYTES = int(os.environ.get("VETO_CV_CACHE_MB", 256)) * 1024 * 1024
+MEMORY_ITEMS = int(os.environ.get("VETO_CV_CACHE_MEMORY_ITEMS", 2048))
+# Replaces the computed version outright, e.g. to pin it or force a fresh one
+VERSION_OVERRIDE = os.environ.get("VETO_PROOFREADER_VERSION")
+
+
+@lru_cache(maxsize=1)
+def proofreader_version() -> str:
+    """Invalidation key for everything derived from CV output.
+
+    The package version alone misses a retrained model or an edited install
+    shipped under the same number, so a hash of the installed files
+    (sources and weights) is appended. `VETO_PROOFREADER_VERSION` overrides it.
+    """
+    if VERSION_OVERRIDE: return VERSION_OVERRIDE
+    try:
+        version = importlib_metadata.version("proofreader")
+    except importlib_metadata.PackageNotFoundError:
+        version = str(getattr(proofreader, "__version__", "unknown"))
+    return f"{version}+{_source_digest()[:12]}"
+
+
+def _source_digest() -> str:
+    root = Path(proofreader.__file__)
+    files = sorted(p for p in root.parent.rglob("*") if p.is_file() and "__pycache__" not in p.parts) \
+        if root.name == "__init__.py" else [root]
+    h = hashlib.blake2b(digest_size=20)
+    for path in files:
+        h.update(f"{path.relative_to(root.parent)}\0{file_digest(path)}\0".encode())
+    return h.hexdigest()
+
+
+def file_digest(path) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TradeDataCache:
+    """Content-addressed cache for `proofreader.get_trade_data` results.
+
+    Entries are keyed by proofreader version + image hash, so renamed or
+    re-downloaded screenshots still hit and a model upgrade invalidates
+    everything. A small in-memory LRU sits in front of a SQLite table that is
+    evicted least-recently-used once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path=CACHE_DIR / "trade_data.sqlite", max_bytes=CACHE_MAX_BYTES, memory_items=MEMORY_ITEMS, version=None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.version = version or proofreader_version()
+
+        self.memory = OrderedDict()  # key -> json text
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+        self._conn.commit()
+        self._bytes = self._total_bytes()
+
+    def key(self, path) -> str:
+        return f"{self.version}:{file_digest(path)}"
+
+    def lookup(self, key) -> Optional[str]:
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def store(self, key, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._conn.commit()
+            self._remember(key, value)
+            self._bytes += len(value)
+            if self._bytes > self.max_bytes: self._evict()
+
+    def get_trade_data(self, path):
+        key = self.key(path)
+        value = self.lookup(key)
+        if value is not None:
+            return json.loads(value)
+
+        self.misses += 1
+        data = proofreader.get_trade_data(str(path))
+        self.store(key, json.dumps(data))
+        return data
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _evict(self):
+        # Other processes write to the same file, so re-read the real total
+        total = self._bytes = self._total_bytes()
+        if total <= self.max_bytes: return
+
+        # Trim to 90% so we don't evict again on the very next insert
+        excess = total - int(self.max_bytes * 0.9)
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0: break
+        self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+        self._conn.commit()
+        for (key,) in doomed:
+            self.memory.pop(key, None)
+        self._bytes = self._total_bytes()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            return {
+                "version": self.version,
+                "entries": entries,
+                "bytes": size,
+                "memory_entries": len(self.memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default = None
+_default_pid = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> TradeDataCache:
+    # One connection per process; pool workers must not share the parent's
+    global _default, _default_pid
+    with _default_lock:
+        if _default is None or _default_pid != os.getpid():
+            _default = TradeDataCache()
+            _default_pid = os.getpid()
+        return _default
+
+
+def get_trade_data(path):
+    """Drop-in replacement for `proofreader.get_trade_data` backed by the shared cache."""
+    return default_cache().get_trade_data(path)
@@ -1,18 +1,94 @@
 from PIL import Image, ImageTk
 from pathlib import Path
+from collections import OrderedDict
+import threading
 import tkinter as tk
+from annotation_store import AnnotationStore, LEGACY_EMPTY_JSON
+from thumbnails import PreviewGenerator, WIDTHS
 
 # ---- Find skipped files ----
-directory = Path("backend/annotated")
+store = AnnotationStore()
 MEDIA_DIR = Path("backend/media")
-
-skipped_files = []
-
-for file in directory.rglob("*.json"):
-    if file.stat().st_size == 0:
-        skipped_files.append(file)
-
-skipped_files.sort()
+THUMBNAILS_DIR = Path("backend/thumbnails")
+MAX_SIZE = (900, 900)
+AHEAD = 8        # images decoded ahead of (and behind) the cursor
+CACHE_ITEMS = 32
+
+# Skips recorded as empty .json files that nobody has left a note on yet;
+# writing a note takes a trade off this list, like filling its file used to
+skipped_files = sorted(row["filename"] for row in store.iter("rejected") if row["note"] == LEGACY_EMPTY_JSON)
+
+# ---- Background decoding ----
+previews = PreviewGenerator(MEDIA_DIR, THUMBNAILS_DIR, workers=0)
+# Smallest server-made preview that still fills the window, if one exists
+PREVIEW_WIDTH = min((w for w in WIDTHS if w >= MAX_SIZE[0]), default=None)
+
+def decode(filename):
+    """Resized PIL image, or None if the screenshot is missing or unreadable."""
+    path = MEDIA_DIR / filename
+    if PREVIEW_WIDTH and previews.path(filename, PREVIEW_WIDTH).exists():
+        path = previews.path(filename, PREVIEW_WIDTH)
+    try:
+        with Image.open(path) as img:
+            img.draft("RGB", MAX_SIZE)
+            img.thumbnail(MAX_SIZE)
+            return img.copy()
+    except OSError:
+        return None
+
+class ImageCache:
+    """Decodes the images around the cursor on a worker thread into a bounded LRU.
+
+    Only PIL work happens off the Tk thread; PhotoImage must be built on it,
+    which for an already-resized image is quick.
+    """
+
+    def __init__(self, files, ahead=AHEAD, capacity=CACHE_ITEMS):
+        self.files = files
+        self.ahead = ahead
+        self.capacity = max(capacity, 2 * ahead + 1)
+        self.images = OrderedDict()  # filename -> PIL image or None
+        self.cursor = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, name="image-cache", daemon=True).start()
+
+    def move(self, cursor):
+        with self._cond:
+            self.cursor = cursor
+            self._cond.notify()
+
+    def get(self, filename):
+        with self._cond:
+            if filename in self.images:
+                self.images.move_to_end(filename)
+                return self.images[filename]
+        # Miss (e.g. first image or a long jump): decode inline once
+        img = decode(filename)
+        self._put(filename, img)
+        return img
+
+    def _wanted(self):
+        # Nearest first, forward before backward
+        c = self.cursor
+        order = [c] + [i for d in range(1, self.ahead + 1) for i in (c + d, c - d)]
+        return [self.files[i] for i in order if 0 <= i < len(self.files) and self.files[i] not in self.images]
+
+    def _put(self, filename, img):
+        with self._cond:
+            self.images[filename] = img
+            self.images.move_to_end(filename)
+            while len(self.images) > self.capacity:
+                self.images.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._wanted():
+                    self._cond.wait()
+                filename = self._wanted()[0]
+            self._put(filename, decode(filename))
+
+cache = ImageCache(skipped_files)
 
 # ---- GUI reviewer ----
 index = 0
@@ -26,41 +102,49 @@ def load_image():
         panel.config(image="")
         return
 
-    skipped = skipped_files[index]
+    cache.move(index)
+    filename = skipped_files[index]
+    img = cache.get(filename)
 
-    # Strip .skipped
-    image_path = (MEDIA_DIR / skipped.name).with_suffix("")
-
-    if not image_path.exists():
-        label.config(text=f"Missing image:\n{image_path}")
+    if img is None:
+        label.config(text=f"Missing image:\n{MEDIA_DIR / filename}")
         panel.config(image="")
         return
 
-    img = Image.open(image_path)
-    img.thumbnail((900, 900))
     img_tk = ImageTk.PhotoImage(img)
 
     panel.config(image=img_tk)
-    label.config(text=f"{index + 1}/{len(skipped_files)}\n{image_path.name}")
+    label.config(text=f"{index + 1}/{len(skipped_files)}\n{filename}")
 
 def write_and_next():
     global index
-    skipped = skipped_files[index]
-
-    # WRITE TO SOURCE .skipped FILE
-    skipped.write_text("ood\n")  # <-- customize if needed
+    if index >= len(skipped_files): return
+    # Queued; the store's writer thread commits bursts of notes together
+    store.set_note(skipped_files[index], "ood")  # <-- customize if needed
 
     index += 1
     load_image()
 
 def skip_and_next():
     global index
+    if index >= len(skipped_files): return
     index += 1
     load_image()
 
+def previous():
+    global index
+    if index == 0: return
+    index -= 1
+    load_image()
+
+def close():
+    store.close()  # commits anything still queued
+    root.destroy()
+
 # ---- UI ----
 root = tk.Tk()
 root.title("Skipped Image Reviewer")
+root.protocol("WM_DELETE_WINDOW", close)
 
 label = tk.Label(root, text="", wraplength=900)
 label.pack(pady=5)
@@ -81,6 +165,7 @@ skip_btn.pack(side=tk.LEFT, padx=5)
 root.bind("<Right>", lambda e: skip_and_next())
 root.bind("<Left>", lambda e: write_and_next())
 root.bind("<Return>", lambda e: write_and_next())
+root.bind("<BackSpace>", lambda e: previous())
 
 load_image()
 root.mainloop()
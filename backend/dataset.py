@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from discovery import SIDES
+
+DATASET_DIR = Path(__file__).parent / "cache" / "dataset"
+VERSION = 2
+
+# Fixed-width columns, each a flat little-endian file appended to in place
+TRADE_COLUMNS = {
+    "message_index": "<i8",  # -1 when unknown
+    "updated_at": "<f8",
+    "accepted": "u1",
+    "duplicate": "u1",       # decision was copied from a repost (see main.propagate_to_duplicates)
+}
+ITEM_COLUMNS = {
+    "trade": "<i8",          # row in the trade table
+    "item": "<i4",           # code into item_ids
+    "side": "u1",            # index into SIDES
+    "updated_at": "<f8",
+}
+TEXT_FILES = ("filenames.txt", "item_ids.jsonl")
+
+
+def _files():
+    return [f"trades.{name}" for name in TRADE_COLUMNS] + [f"items.{name}" for name in ITEM_COLUMNS] + list(TEXT_FILES)
+
+
+def _manifest(path):
+    try:
+        manifest = json.loads((path / "manifest.json").read_text())
+    except (OSError, ValueError):
+        manifest = None
+    if not manifest or manifest.get("version") != VERSION:
+        manifest = {"version": VERSION, "trades": 0, "items": 0, "seq": 0, "sizes": {}}
+    return manifest
+
+
+class Dataset:
+    """Columnar copy of the annotation store: a trade table and an item table.
+
+    Each column is a flat file under `DATASET_DIR`, memory-mapped on load, so
+    analytics read a few arrays instead of parsing every trade's JSON. Item
+    ids are dictionary-coded into `item_ids`; item rows are stored in trade
+    order. The files are only ever appended to (see `export`), so a trade
+    decided twice has two rows and `latest` picks the newer one.
+    """
+
+    def __init__(self, path=DATASET_DIR):
+        self.path = Path(path)
+        self.manifest = _manifest(self.path)
+        self.trades = {name: self._column(f"trades.{name}", dtype, self.manifest["trades"]) for name, dtype in TRADE_COLUMNS.items()}
+        self.items = {name: self._column(f"items.{name}", dtype, self.manifest["items"]) for name, dtype in ITEM_COLUMNS.items()}
+        self.filenames = self._text("filenames.txt")
+        self.item_ids = [json.loads(line) for line in self._text("item_ids.jsonl")]
+
+    def _column(self, name, dtype, rows):
+        if not rows: return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode="r", shape=(rows,))
+
+    def _text(self, name):
+        size = self.manifest["sizes"].get(name, 0)
+        if not size: return []
+        with open(self.path / name, "rb") as f:
+            return f.read(size).decode("utf-8").splitlines()
+
+    def __len__(self):
+        return self.manifest["trades"]
+
+    def latest(self) -> np.ndarray:
+        """Mask of trade rows holding their filename's newest decision."""
+        last = {filename: i for i, filename in enumerate(self.filenames)}
+        mask = np.zeros(len(self), dtype=bool)
+        mask[list(last.values())] = True
+        return mask
+
+    def accepted(self, skip_duplicates=True) -> np.ndarray:
+        """Trade rows currently accepted, oldest decision first."""
+        mask = self.latest() & (self.trades["accepted"] == 1)
+        if skip_duplicates: mask &= self.trades["duplicate"] == 0
+        return np.flatnonzero(mask)
+
+
+def export(store, path=DATASET_DIR) -> int:
+    """Appends annotations changed since the last export; returns how many.
+
+    The watermark is the store's `seq`, assigned at commit, so a decision
+    another process commits late is still picked up on the next export.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    manifest = _manifest(path)
+    store.flush()
+
+    # Drop anything a crashed export wrote past the last manifest
+    for name in _files():
+        with open(path / name, "ab") as f:
+            f.truncate(manifest["sizes"].get(name, 0))
+
+    item_codes = {}
+    with open(path / "item_ids.jsonl", "rb") as f:
+        for line in f.read(manifest["sizes"].get("item_ids.jsonl", 0)).splitlines():
+            item_codes[line.decode("utf-8")] = len(item_codes)
+
+    trades = {name: [] for name in TRADE_COLUMNS}
+    items = {name: [] for name in ITEM_COLUMNS}
+    filenames, new_ids = [], []
+    row = None
+    for row in store.iter(since=manifest["seq"]):
+        trade = manifest["trades"] + len(filenames)
+        filenames.append(row["filename"])
+        trades["message_index"].append(-1 if row["message_index"] is None else row["message_index"])
+        trades["updated_at"].append(row["updated_at"])
+        trades["accepted"].append(row["status"] == "accepted")
+        trades["duplicate"].append(row["duplicate_of"] is not None)
+
+        metadata = row["metadata"] if isinstance(row["metadata"], dict) else {}
+        for side, key in enumerate(SIDES):
+            side_data = metadata.get(key)
+            for item in side_data.get("items", []) if isinstance(side_data, dict) else []:
+                iid = item.get("id") if isinstance(item, dict) else None
+                if iid is None: continue
+                code = json.dumps(iid)
+                if code not in item_codes:
+                    item_codes[code] = len(item_codes)
+                    new_ids.append(code)
+                items["trade"].append(trade)
+                items["item"].append(item_codes[code])
+                items["side"].append(side)
+                items["updated_at"].append(row["updated_at"])
+
+    if row is None: return 0
+
+    for table, columns, values in (("trades", TRADE_COLUMNS, trades), ("items", ITEM_COLUMNS, items)):
+        for name, dtype in columns.items():
+            with open(path / f"{table}.{name}", "ab") as f:
+                f.write(np.asarray(values[name], dtype=dtype).tobytes())
+    for name, lines in (("filenames.txt", filenames), ("item_ids.jsonl", new_ids)):
+        with open(path / name, "ab") as f:
+            f.write("".join(f"{line}\n" for line in lines).encode("utf-8"))
+
+    manifest["trades"] += len(filenames)
+    manifest["items"] += len(items["trade"])
+    manifest["seq"] = row["seq"]
+    manifest["sizes"] = {name: (path / name).stat().st_size for name in _files()}
+    tmp = path / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, path / "manifest.json")
+    return len(filenames)
+
+
+def main():
+    from annotation_store import AnnotationStore, DEFAULT_PATH
+
+    parser = argparse.ArgumentParser(description="Append new annotations to the columnar dataset")
+    parser.add_argument("--db", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--out", type=Path, default=DATASET_DIR)
+    args = parser.parse_args()
+
+    store = AnnotationStore(args.db)
+    s = perf_counter()
+    added = export(store, args.out)
+    store.close()
+    elapsed = perf_counter() - s
+
+    dataset = Dataset(args.out)
+    size = sum((args.out / name).stat().st_size for name in _files() if (args.out / name).exists())
+    print(f"Appended {added} annotations in {elapsed:.2f}s")
+    print(f"{len(dataset)} trade rows ({len(dataset.accepted())} accepted), {dataset.manifest['items']} item rows, "
+          f"{len(dataset.item_ids)} distinct items, {size / 1e6:.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from dateutil import parser
+
+DASHES_RE = re.compile(r"[–—\.]")
+ORDINAL_RE = re.compile(r"(\d+)(st|nd|rd|th)")
+PARENS_RE = re.compile(r"\(.*?\)")
+SIMPLE_RE = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?")
+
+# dateutil resolves two-digit years against the year it was imported in
+_YEAR = time.localtime().tm_year
+_CENTURY = _YEAR // 100 * 100
+
+
+def parse_date_value(raw_val, epoch_context):
+    """Resolves a scraped date string against the message's timestamp.
+
+    m/d, d/m, m/d/yy and d/m/yyyy shapes are resolved by hand exactly the way
+    dateutil would; anything else falls back to dateutil. Results are memoized
+    on (normalized string, context date), since the same few strings repeat
+    across thousands of messages.
+    """
+    context_date = datetime.fromtimestamp(epoch_context).date()
+
+    raw_val = raw_val.lower().strip()
+
+    if "today" in raw_val:
+        return context_date
+
+    return _parse_normalized(normalize(raw_val), context_date)
+
+
+def normalize(raw_val):
+    normalized = DASHES_RE.sub("/", raw_val)
+    normalized = ORDINAL_RE.sub(r"\1", normalized)
+    return PARENS_RE.sub("", normalized).strip()
+
+
+@lru_cache(maxsize=65536)
+def _parse_normalized(normalized, context_date):
+    candidates = _fast_candidates(normalized, context_date)
+    if candidates is None:
+        candidates = _dateutil_candidates(normalized, context_date)
+
+    possibilities = []
+    for parsed_date in candidates:
+        delta_days = abs((parsed_date - context_date).days)
+
+        if delta_days > 1:
+            try:
+                parsed_date = parsed_date.replace(year=context_date.year)
+            except ValueError:
+                parsed_date = parsed_date.replace(
+                    year=context_date.year,
+                    day=28
+                )
+
+        possibilities.append(parsed_date)
+
+    if not possibilities:
+        return None
+
+    return min(
+        possibilities,
+        key=lambda d: abs((d - context_date).days)
+    )
+
+
+def _fast_candidates(normalized, context_date):
+    """Dates for dayfirst=True then False, or None if the shape isn't simple."""
+    match = SIMPLE_RE.fullmatch(normalized)
+    if not match: return None
+
+    first, second, year_text = int(match[1]), int(match[2]), match[3]
+    # dateutil would read a value over 31 as the year
+    if first > 31 or second > 31: return None
+
+    if year_text is None:
+        year = context_date.year
+    else:
+        year = int(year_text)
+        if len(year_text) == 2:
+            year += _CENTURY
+            if year >= _YEAR + 50: year -= 100
+            elif year < _YEAR - 50: year += 100
+
+    candidates = []
+    for dayfirst in (True, False):
+        if year_text is None:
+            day_month = dayfirst and second <= 12
+        else:
+            day_month = first > 12 or (dayfirst and second <= 12)
+        day, month = (first, second) if day_month else (second, first)
+        try:
+            candidates.append(context_date.replace(year=year, month=month, day=day))
+        except ValueError:
+            continue
+    return candidates
+
+
+def _dateutil_candidates(normalized, context_date):
+    default = datetime(context_date.year, context_date.month, context_date.day)
+    candidates = []
+    for dayfirst in (True, False):
+        try:
+            dt = parser.parse(
+                normalized,
+                dayfirst=dayfirst,
+                default=default
+            )
+        except (ValueError, OverflowError, TypeError):
+            continue
+        candidates.append(dt.date())
+    return candidates
@@ -0,0 +1,100 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+FIELDS = ("sender", "receiver", "date")
+
+# All three fields in one scan. The gap between key and value is captured so
+# we can tell when a match ran onto the next line ("s:" with nothing after
+# it); only then can one field's match swallow another field's line.
+FIELD_RE = re.compile(
+    r"(?m)^\s*(?:(sender|s)|(rec(?:ei|ie)ver|r)|(date|d))(\s*[:\-]?\s*)(.*)"
+)
+
+# Slow path for that case: a non-consuming match at every line start, from
+# which we replay exactly what the old one-findall-per-field loop kept.
+OVERLAP_RE = re.compile(
+    r"(?m)^(?=(?P<span>\s*(?:(?P<sender>sender|s)|(?P<receiver>rec(?:ei|ie)ver|r)|(?P<date>date|d))\s*[:\-]?\s*(?P<value>.*)))"
+)
+
+NAME_RE = re.compile(r"^[a-zA-Z0-9_]+$")
+
+
+def decode_text(data):
+    """Extracts sender/receiver/date from a trade message; the last of each wins."""
+    data = data.lower()
+
+    found = {}
+    for sender, receiver, _, gap, value in FIELD_RE.findall(data):
+        if "\n" in gap:
+            found = _find_overlapping(data)
+            break
+        found["sender" if sender else "receiver" if receiver else "date"] = value
+
+    results = {}
+    for key in FIELDS:
+        val = found.get(key)
+        if val is None:
+            results[key] = None
+            continue
+        val = val.strip().strip('<>').strip()
+        if key == "date" and "," in val:
+            val = val.split(',')[-1].strip()
+        results[key] = val
+    return results
+
+
+def _find_overlapping(data):
+    found = {}
+    ends = {}
+    for match in OVERLAP_RE.finditer(data):
+        key = next(k for k in FIELDS if match.group(k) is not None)
+        # findall per field never returned overlapping matches
+        if match.start() < ends.get(key, 0): continue
+        ends[key] = match.end("span")
+        found[key] = match.group("value")
+    return found
+
+
+def _decode_chunk(texts):
+    return [decode_text(text) for text in texts]
+
+
+def decode_batch(texts, workers=1, chunksize=5000):
+    """Decodes many message texts, optionally spread over a process pool.
+
+    Decoding is cheap, so a pool only pays off for very large corpora; with
+    `workers > 1` callers on Windows need an `if __name__ == "__main__"` guard.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) <= chunksize:
+        return _decode_chunk(texts)
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_decode_chunk, chunks):
+            results += chunk
+    return results
+
+
+def decode_messages(messages, workers=1):
+    """`decode_batch` over buffer messages (`message[0]` is the text)."""
+    return decode_batch((message[0] for message in messages), workers=workers)
+
+
+def is_valid_roblox_name(name):
+    if not (3 <= len(name) <= 20):
+        return False, "Name must be between 3 and 20 characters."
+
+    if not NAME_RE.match(name):
+        return False, "Only letters, numbers, and one underscore allowed."
+
+    if name.startswith('_') or name.endswith('_'):
+        return False, "Underscore cannot be at the start or end."
+
+    if "__" in name:
+        return False, "Cannot have multiple underscores in a row."
+
+    if name.count('_') > 1:
+        return False, "Only one underscore is allowed."
+
+    return True, "Valid username."
@@ -0,0 +1,105 @@
+
+import numpy as np
+
+LABELS = ["Seen 1x", "Seen 2-5x", "Seen 6-20x", "Seen 21-100x", "Seen 101+x"]
+COLORS = ["#2c3e50", "#34495e", "#5d6d7e", "#85929e", "#aeb6bf"]
+SIDES = ("incoming", "outgoing")
+
+# The count at which an item enters each bin; it leaves the previous one then
+BIN_STARTS = {1: 0, 2: 1, 6: 2, 21: 3, 101: 4}
+
+
+def get_bin(count):
+    if count == 1: return "Seen 1x"
+    if 2 <= count <= 5: return "Seen 2-5x"
+    if 6 <= count <= 20: return "Seen 6-20x"
+    if 21 <= count <= 100: return "Seen 21-100x"
+    return "Seen 101+x"
+
+
+def trade_item_ids(data) -> set:
+    """Distinct item ids on either side of a trade."""
+    ids = set()
+    for side in SIDES:
+        for item in data.get(side, {}).get("items", []):
+            iid = item.get("id")
+            if iid is not None: ids.add(iid)
+    return ids
+
+
+class DiscoveryHistogram:
+    """How many distinct items have been seen 1x, 2-5x, ... after each trade.
+
+    Rebuilding the histogram from every item's count after each trade costs
+    O(unique items) per trade. An item only changes bin when its count hits
+    one of BIN_STARTS, so each increment moves at most one item between two
+    bins in O(1). One row per trade is appended to a NumPy array that grows
+    by doubling.
+    """
+
+    def __init__(self, capacity=1024):
+        self.counts = {}
+        self.bins = np.zeros(len(LABELS), dtype=np.int64)
+        self._history = np.zeros((capacity, len(LABELS)), dtype=np.int64)
+        self.trades = 0
+
+    def add_trade(self, item_ids):
+        counts, bins = self.counts, self.bins
+        for iid in item_ids:
+            count = counts.get(iid, 0) + 1
+            counts[iid] = count
+            k = BIN_STARTS.get(count)
+            if k is not None:
+                bins[k] += 1
+                if k: bins[k - 1] -= 1
+
+        if self.trades == len(self._history):
+            grown = np.zeros((2 * len(self._history), len(LABELS)), dtype=np.int64)
+            grown[:self.trades] = self._history
+            self._history = grown
+        self._history[self.trades] = bins
+        self.trades += 1
+
+    def add_trades(self, trades):
+        for item_ids in trades:
+            self.add_trade(item_ids)
+        return self
+
+    @property
+    def history(self) -> np.ndarray:
+        """(trades, bins) array of bin sizes after each trade."""
+        return self._history[:self.trades]
+
+    def series(self) -> dict:
+        """{label: bin sizes after each trade}, in LABELS order."""
+        return {label: self.history[:, k] for k, label in enumerate(LABELS)}
+
+
+def history_from_items(trades, items, n_trades) -> np.ndarray:
+    """`DiscoveryHistogram.history` from item rows, with no per-trade loop.
+
+    `trades[j]` is the position (0..n_trades-1) of the trade holding integer
+    item `items[j]`. Pairs are sorted by (item, trade) so each item's running
+    count is its offset within its run; the bin moves at BIN_STARTS become
+    per-trade deltas, and the history is their cumulative sum.
+    """
+    trades = np.asarray(trades, dtype=np.int64)
+    items = np.asarray(items, dtype=np.int64)
+    order = np.lexsort((trades, items))
+    trades, items = trades[order], items[order]
+    # An item listed twice in one trade (or on both sides) counts once
+    keep = np.ones(len(items), dtype=bool)
+    keep[1:] = (items[1:] != items[:-1]) | (trades[1:] != trades[:-1])
+    trades, items = trades[keep], items[keep]
+
+    run_start = np.ones(len(items), dtype=bool)
+    run_start[1:] = items[1:] != items[:-1]
+    first = np.maximum.accumulate(np.where(run_start, np.arange(len(items)), 0))
+    counts = np.arange(len(items)) - first + 1
+
+    deltas = np.zeros((n_trades, len(LABELS)), dtype=np.int64)
+    for count, k in BIN_STARTS.items():
+        at = trades[counts == count]
+        np.add.at(deltas[:, k], at, 1)
+        if k: np.add.at(deltas[:, k - 1], at, -1)
+    return np.cumsum(deltas, axis=0)
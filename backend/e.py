@@ -1,69 +1,26 @@
-import proofreader
 from pathlib import Path
-import time
-import numpy as np
-import json
+from annotation_store import AnnotationStore
+from evaluate import evaluate_incremental
 
-def median_p95(latencies):
-    arr = np.array(latencies)
-    median = np.median(arr)
-    p95 = np.percentile(arr, 95)
-    return median, p95
-
-directory = Path("backend/annotated")
+# Latency benchmarks live in benchmark.py; this is the quick match/mismatch check
+store = AnnotationStore()
 media = Path("backend/media")
 
-files_to_process = []
-
-for file in directory.rglob("*"):
-    if file.is_file():
-        # Skip certain JSON by name
-        if file.suffix == ".json" and file.name != "455b8e6e-b627-4418-8619-030056fa2bd7.png.json":
-            # Only include non-empty JSONs
-            if file.stat().st_size != 0:
-                files_to_process.append(file)
-        # Include .skipped if empty (not already written)
-        elif file.suffix == ".skipped" and file.stat().st_size == 0:
-            files_to_process.append(file)
+# Accepted trades are the ground truth; skip certain ones by name, and
+# decisions copied from a reposted screenshot so each trade counts once
+files_to_process = [
+    row for row in store.iter("accepted")
+    if row["filename"] != "455b8e6e-b627-4418-8619-030056fa2bd7.png" and row["duplicate_of"] is None
+]
 
 print(len(files_to_process))
 
-paths = []
-times = []
-#(np.float64(0.13941979999981413), np.float64(0.233303030001116))
-#np.float64(0.034562549999463954), np.float64(0.067776705000324
-#(np.float64(0.036774549999790906), np.float64(0.0733961049989375))*!
-
-for file in files_to_process:
-    paths.append(str(media / file.with_suffix("").name))
-
-if False:
-    for i in range(10):
-        s = time.perf_counter()
-        for path in paths:
-            data = proofreader.get_trade_data(path)
-        print(i, time.perf_counter()-s)
-
-    for i in range(50):
-        for path in paths:
-            s = time.perf_counter()
-            data = proofreader.get_trade_data(path)
-            times.append(time.perf_counter() - s)
-
-    print(median_p95(times))
-
-g = 0
-n = 0
-
-for path in paths:
-    data = proofreader.get_trade_data(path)
-
-    with open(directory / f"{Path(path).name}.json", "r") as f:
-        if f.read() == json.dumps(data, indent=2):
-            g += 1
-        else:
-            n += 1
+# Predictions are kept per (image hash, proofreader version), so a rerun on
+# the same model only re-scores
+report = evaluate_incremental(files_to_process, media, workers=1)
 
-print(g, n)
+print(report["correct"], report["incorrect"])
+if report["previous_version"]:
+    print(f"vs {report['previous_version']}: {len(report['flips']['fixed'])} fixed, {len(report['flips']['broken'])} broken")
 
-#442, 58
\ No newline at end of file
+#442, 58
@@ -0,0 +1,107 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from cv_cache import CACHE_DIR, file_digest, proofreader_version
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    digest TEXT NOT NULL,
+    version TEXT NOT NULL,
+    prediction TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (digest, version)
+);
+CREATE TABLE IF NOT EXISTS digests (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    version TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    extracted INTEGER NOT NULL
+);
+"""
+
+
+class EvaluationStore:
+    """Every prediction the evaluation has made, per (image hash, proofreader version).
+
+    Unlike `cv_cache` nothing is evicted, and old versions are kept so a run
+    can be compared with the previous one. Predictions are stored rather
+    than verdicts, so correcting a ground-truth annotation only means
+    re-scoring, never re-extracting. Image hashes are memoized by file size
+    and mtime.
+    """
+
+    def __init__(self, path=CACHE_DIR / "evaluations.sqlite", version=None):
+        self.path = Path(path)
+        self.version = version or proofreader_version()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def digest(self, path) -> str:
+        path = Path(path)
+        st = path.stat()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM digests WHERE filename = ? AND size = ? AND mtime_ns = ?",
+                (path.name, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+        if row: return row[0]
+
+        digest = file_digest(path)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)", (path.name, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def predictions(self, digests, version=None) -> dict:
+        """{digest: (prediction, error)} already recorded for `version` (default: current)."""
+        version = version or self.version
+        found = {}
+        with self._lock:
+            for digest in set(digests):
+                row = self._conn.execute(
+                    "SELECT prediction, error FROM predictions WHERE digest = ? AND version = ?", (digest, version)
+                ).fetchone()
+                if row: found[digest] = (json.loads(row[0]) if row[0] is not None else None, row[1])
+        return found
+
+    def save(self, digest, prediction, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                (digest, self.version, None if error else json.dumps(prediction), error, time.time()),
+            )
+
+    def previous_version(self):
+        """The most recently evaluated version other than the current one, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM runs WHERE version != ? ORDER BY finished_at DESC LIMIT 1", (self.version,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_run(self, total, correct, extracted):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", (self.version, time.time(), total, correct, extracted))
+
+    def stats(self):
+        with self._lock:
+            versions, predictions = self._conn.execute("SELECT COUNT(DISTINCT version), COUNT(*) FROM predictions").fetchone()
+            current = self._conn.execute("SELECT COUNT(*) FROM predictions WHERE version = ?", (self.version,)).fetchone()[0]
+        return {"version": self.version, "versions": versions, "predictions": predictions, "current": current}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import cv_cache
+
+SIDES = ("incoming", "outgoing")
+
+
+def json_diff(pred, truth, path=""):
+    diffs = []
+    if isinstance(pred, dict) and isinstance(truth, dict):
+        for key in set(pred.keys()).union(truth.keys()):
+            new_path = f"{path}.{key}" if path else key
+            if key not in pred:
+                diffs.append(f"Missing in predicted: {new_path} = {truth[key]}")
+            elif key not in truth:
+                diffs.append(f"Extra in predicted: {new_path} = {pred[key]}")
+            else:
+                diffs.extend(json_diff(pred[key], truth[key], new_path))
+    elif isinstance(pred, list) and isinstance(truth, list):
+        for i, (p_item, t_item) in enumerate(zip(pred, truth)):
+            new_path = f"{path}[{i}]"
+            diffs.extend(json_diff(p_item, t_item, new_path))
+        # Handle extra items
+        if len(pred) > len(truth):
+            for i in range(len(truth), len(pred)):
+                diffs.append(f"Extra in predicted: {path}[{i}] = {pred[i]}")
+        elif len(truth) > len(pred):
+            for i in range(len(pred), len(truth)):
+                diffs.append(f"Missing in predicted: {path}[{i}] = {truth[i]}")
+    else:
+        if pred != truth:
+            diffs.append(f"{path}: predicted={pred} | truth={truth}")
+    return diffs
+
+
+def field_errors(pred, truth) -> Counter:
+    """Which fields of a trade are wrong, per side.
+
+    `<side>.items` is a wrong item count, `<side>.ids` a wrong multiset of item
+    ids, `<side>.item_<key>` a wrong per-slot item field (e.g. name), and any
+    other side key (e.g. `robux_value`) is compared as a plain value.
+    """
+    errors = Counter()
+    for side in SIDES:
+        p = (pred or {}).get(side) or {}
+        t = (truth or {}).get(side) or {}
+        p_items = p.get("items") or []
+        t_items = t.get("items") or []
+
+        if len(p_items) != len(t_items):
+            errors[f"{side}.items"] += 1
+        if Counter(item.get("id") for item in p_items) != Counter(item.get("id") for item in t_items):
+            errors[f"{side}.ids"] += 1
+        for p_item, t_item in zip(p_items, t_items):
+            for key in set(p_item) | set(t_item):
+                if key != "id" and p_item.get(key) != t_item.get(key):
+                    errors[f"{side}.item_{key}"] += 1
+
+        for key in (set(p) | set(t)) - {"items"}:
+            if p.get(key) != t.get(key):
+                errors[f"{side}.{key}"] += 1
+    return errors
+
+
+def score(filename, pred, truth, error=None) -> dict:
+    if error:
+        return {"filename": filename, "correct": False, "error": error, "fields": {}, "diff": []}
+    if pred == truth:
+        return {"filename": filename, "correct": True, "error": None, "fields": {}, "diff": []}
+    return {
+        "filename": filename,
+        "correct": False,
+        "error": None,
+        "fields": dict(field_errors(pred, truth)),
+        "diff": json_diff(pred, truth),
+    }
+
+
+def predict_one(job):
+    """Runs in a worker process: extracts one image, returns (prediction, error)."""
+    filename, path, truth = job
+    try:
+        return cv_cache.get_trade_data(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def evaluate_one(job):
+    """Runs in a worker process: extracts one image and scores it."""
+    pred, error = predict_one(job)
+    return score(job[0], pred, job[2], error)
+
+
+def iter_results(jobs, workers=None, chunksize=8, fn=evaluate_one):
+    """Yields `fn` (default `evaluate_one`) results as the pool finishes them, in job order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(fn, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(fn, jobs, chunksize=chunksize)
+
+
+def summarize(results, elapsed, version=None) -> dict:
+    correct = 0
+    errors = 0
+    fields = Counter()
+    failures = []
+    for result in results:
+        if result["correct"]:
+            correct += 1
+            continue
+        if result["error"]: errors += 1
+        fields.update(result["fields"])
+        failures.append(result)
+
+    total = len(results)
+    return {
+        "proofreader_version": version or cv_cache.proofreader_version(),
+        "total": total,
+        "correct": correct,
+        "incorrect": total - correct,
+        "errors": errors,
+        "accuracy": correct / total if total else 0.0,
+        "field_errors": dict(fields.most_common()),
+        "elapsed_s": round(elapsed, 3),
+        "failures": failures,
+    }
+
+
+def write_report(report, report_path):
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def evaluate(rows, media_dir, workers=None, report_path=None, on_result=None) -> dict:
+    """Scores CV output against accepted annotations (`AnnotationStore.iter` rows)."""
+    jobs = [(row["filename"], str(Path(media_dir) / row["filename"]), row["metadata"]) for row in rows]
+    start = time.perf_counter()
+
+    results = []
+    for result in iter_results(jobs, workers):
+        if on_result: on_result(result)
+        results.append(result)
+
+    report = summarize(results, time.perf_counter() - start)
+    write_report(report, report_path)
+    return report
+
+
+def evaluate_incremental(rows, media_dir, store=None, workers=None, report_path=None, on_result=None, retry_errors=True) -> dict:
+    """`evaluate`, extracting only images the current proofreader version hasn't seen.
+
+    Predictions come from and go to an `EvaluationStore`, keyed by image hash
+    and version. Every row is re-scored against its current annotation, and
+    also against the last other version's prediction when there is one; the
+    report's `flips` lists images that went from correct to incorrect
+    ("broken") or back ("fixed") since that version.
+
+    A stored prediction that raised is extracted again unless `retry_errors`
+    is off, so a transient failure doesn't stick for the whole version.
+    """
+    from eval_store import EvaluationStore
+
+    store = store or EvaluationStore()
+    start = time.perf_counter()
+    media_dir = Path(media_dir)
+
+    digests = {}
+    missing = {}
+    for row in rows:
+        try:
+            digests[row["filename"]] = store.digest(media_dir / row["filename"])
+        except OSError as e:
+            missing[row["filename"]] = f"{type(e).__name__}: {e}"
+
+    known = store.predictions(digests.values())
+    todo = []
+    scheduled = set()  # an image shared by several rows is extracted once
+    for row in rows:
+        digest = digests.get(row["filename"])
+        if digest is None or digest in scheduled: continue
+        entry = known.get(digest)
+        if entry is not None and (entry[1] is None or not retry_errors): continue
+        scheduled.add(digest)
+        todo.append((row["filename"], str(media_dir / row["filename"]), row["metadata"]))
+
+    # Counted before extracting: these are the images an earlier run already did
+    reused = len(known.keys() - scheduled)
+
+    for job, (pred, error) in zip(todo, iter_results(todo, workers, fn=predict_one)):
+        store.save(digests[job[0]], pred, error)
+        known[digests[job[0]]] = (pred, error)
+
+    previous_version = store.previous_version()
+    previous = store.predictions(digests.values(), previous_version) if previous_version else {}
+
+    results = []
+    flips = {"fixed": [], "broken": []}
+    for row in rows:
+        digest = digests.get(row["filename"])
+        if digest is None:
+            result = score(row["filename"], None, row["metadata"], missing[row["filename"]])
+        else:
+            pred, error = known[digest]
+            result = score(row["filename"], pred, row["metadata"], error)
+        if on_result: on_result(result)
+        results.append(result)
+        if digest in previous:
+            pred, error = previous[digest]
+            if score(row["filename"], pred, row["metadata"], error)["correct"] != result["correct"]:
+                flips["fixed" if result["correct"] else "broken"].append(row["filename"])
+
+    report = summarize(results, time.perf_counter() - start, store.version)
+    report.update({
+        "extracted": len(todo),
+        "reused": reused,
+        "missing_images": len(missing),
+        "previous_version": previous_version,
+        "flips": flips,
+    })
+    store.record_run(report["total"], report["correct"], len(todo))
+    write_report(report, report_path)
+    return report
@@ -0,0 +1,84 @@
+import json
+import threading
+from pathlib import Path
+
+
+def buffer_sort_key(path: Path):
+    return int(path.stem) if path.stem.isdigit() else 0
+
+
+def load_messages(buffers_dir) -> list:
+    """One-shot load of every buffer, in the same order the server uses."""
+    messages = []
+    BufferIngester(buffers_dir, messages).scan()
+    return messages
+
+
+class BufferIngester:
+    """Appends new or grown `buffers/*.json` files to an in-memory message list.
+
+    Each file's size and mtime are remembered, so a scan only stats unchanged
+    buffers and re-parses files that are new or were written to. Messages are
+    only ever appended, which keeps every existing `message_index` stable; new
+    files land after everything already loaded, whatever their number.
+    `on_messages(new_messages, start)` is called for each appended batch.
+    """
+
+    def __init__(self, buffers_dir, messages, on_messages=None, interval=2.0):
+        self.buffers_dir = Path(buffers_dir)
+        self.messages = messages
+        self.on_messages = on_messages
+        self.interval = interval
+        self.seen = {}  # file name -> (size, mtime_ns, message count)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scan(self) -> int:
+        """Ingests whatever changed since the last scan; returns messages added."""
+        if not self.buffers_dir.exists(): return 0
+        added = 0
+        with self._lock:
+            for file_path in sorted(self.buffers_dir.glob("*.json"), key=buffer_sort_key):
+                st = file_path.stat()
+                size, mtime, count = self.seen.get(file_path.name, (None, None, 0))
+                if (size, mtime) == (st.st_size, st.st_mtime_ns): continue
+
+                try:
+                    with open(file_path, "r") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Most likely caught mid-write by the scraper; retry next scan
+                    print(f"Skipping buffer {file_path.name}: {e}")
+                    continue
+
+                new = data[count:]
+                self.seen[file_path.name] = (st.st_size, st.st_mtime_ns, max(count, len(data)))
+                if not new: continue
+
+                start = len(self.messages)
+                self.messages.extend(new)
+                added += len(new)
+                if self.on_messages: self.on_messages(new, start)
+        return added
+
+    def start(self):
+        if self.interval <= 0 or self._thread: return
+        self._thread = threading.Thread(target=self._run, name="buffer-ingester", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                added = self.scan()
+            except Exception as e:
+                print(f"Buffer scan failed: {e}")
+                continue
+            if added: print(f"Ingested {added} new messages")
@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from pathlib import Path
+
+from annotation_store import DEFAULT_PATH, connect
+
+TTL = float(os.environ.get("VETO_LEASE_TTL", 300))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    filename TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_expiry ON leases(expires_at);
+"""
+
+# Takes the row only if it's free, expired, already ours or held by `take_from`
+ACQUIRE = """
+INSERT INTO leases (filename, client_id, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(filename) DO UPDATE SET
+    client_id = excluded.client_id,
+    expires_at = excluded.expires_at
+WHERE leases.expires_at <= ? OR leases.client_id = excluded.client_id OR leases.client_id = ?
+"""
+
+
+class LeaseTable:
+    """Which client each handed-out trade is reserved for, and until when.
+
+    Lives in the annotation database so every uvicorn worker sees the same
+    leases. Writes are synchronous, unlike AnnotationStore's queued ones:
+    an acquire has to know right away whether another process got there
+    first. A trade is free again once its lease is released (on /action) or
+    has expired; a client renews all its leases each time it asks for more.
+
+    Each worker's prefetch feeder also holds short leases, under its own
+    client id, on the trades it is extracting or has queued, so two workers
+    never run CV on the same trade; a client's lease takes them over.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def acquire(self, filename: str, client_id: str, ttl=None, take_from=None) -> bool:
+        """Leases `filename` to `client_id`; False if someone other than `take_from` holds it."""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(ACQUIRE, (filename, client_id, now + (ttl or self.ttl), now, take_from))
+            return cursor.rowcount == 1
+
+    def renew(self, client_id: str) -> list:
+        """Extends every unexpired lease `client_id` holds; returns their filenames."""
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT filename FROM leases WHERE client_id = ? AND expires_at > ?", (client_id, now)
+            ).fetchall()
+            self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE client_id = ? AND expires_at > ?",
+                (now + self.ttl, client_id, now),
+            )
+        return [filename for (filename,) in rows]
+
+    def retain(self, client_id: str, filenames, ttl=None):
+        """Renews the leases `client_id` holds on `filenames` and releases the rest of its leases."""
+        keep = set(filenames)
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT filename FROM leases WHERE client_id = ?", (client_id,)).fetchall()
+            self._conn.executemany(
+                "DELETE FROM leases WHERE filename = ? AND client_id = ?",
+                [(filename, client_id) for (filename,) in rows if filename not in keep],
+            )
+            self._conn.execute("UPDATE leases SET expires_at = ? WHERE client_id = ?", (now + (ttl or self.ttl), client_id))
+
+    def release(self, filenames, client_id=None):
+        """Frees `filenames`; with `client_id`, only the ones it holds."""
+        rows = [(f,) if client_id is None else (f, client_id) for f in filenames]
+        if not rows: return
+        sql = "DELETE FROM leases WHERE filename = ?" + ("" if client_id is None else " AND client_id = ?")
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def held_by_others(self, client_id: str, *mine) -> set:
+        """Filenames under an unexpired lease to any client but `client_id` and `mine`."""
+        ours = (client_id, *mine)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT filename FROM leases WHERE expires_at > ? AND client_id NOT IN ({', '.join('?' * len(ours))})",
+                (time.time(), *ours),
+            ).fetchall()
+        return {filename for (filename,) in rows}
+
+    def active(self) -> set:
+        """Every filename under an unexpired lease."""
+        with self._lock:
+            rows = self._conn.execute("SELECT filename FROM leases WHERE expires_at > ?", (time.time(),)).fetchall()
+        return {filename for (filename,) in rows}
+
+    def purge(self) -> int:
+        """Deletes expired leases; acquire ignores them anyway."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            active, clients = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT client_id) FROM leases WHERE expires_at > ?", (now,)
+            ).fetchone()
+        return {"active": active, "clients": clients, "ttl": self.ttl}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
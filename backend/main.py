@@ -1,13 +1,49 @@
-import json
-import proofreader
+import os
+import uuid
+import asyncio
+import sqlite3
+import cv_cache
+from time import perf_counter
 from pathlib import Path
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional
-from fastapi import FastAPI, Query
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from prefetch import PrefetchPool, extract_timed
+from status_index import StatusIndex
+from ingest import BufferIngester
+from thumbnails import PreviewGenerator
+from static_cache import CachedStaticFiles, preload_links
+from annotation_store import AnnotationStore
+from leases import LeaseTable
+from phash import PerceptualIndex
+from trade_index import TradeIndex
+from metrics import Registry, Counter, Gauge, Histogram
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    global CV_POOL, CV_SLOTS
+    CV_POOL = ProcessPoolExecutor(max_workers=CV_WORKERS)
+    CV_SLOTS = asyncio.Semaphore(CV_CONCURRENCY)
+    PREVIEWS.start()
+    PHASH.start()
+    PREFETCH.start()
+    INGESTER.start()
+    yield
+    INGESTER.stop()
+    PREFETCH.stop()
+    LEASES.retain(PREFETCH_HOLDER, ())
+    CV_POOL.shutdown(wait=False, cancel_futures=True)
+    PREVIEWS.stop()
+    PHASH.close()
+    STORE.close()
+    LEASES.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,18 +59,91 @@ MEDIA_DIR = Path("media")
 THUMBNAILS_DIR = Path("thumbnails")
 BUFFERS_DIR = Path("buffers")
 
+# Prefetch
+PREFETCH_WORKERS = int(os.environ.get("VETO_PREFETCH_WORKERS", 2))
+PREFETCH_DEPTH = int(os.environ.get("VETO_PREFETCH_DEPTH", 8))
+# Seconds before a trade whose background CV failed is retried
+PREFETCH_RETRY = float(os.environ.get("VETO_PREFETCH_RETRY", 60))
+# Seconds a dead worker's feeder keeps its trades reserved; live feeders renew every second
+PREFETCH_LEASE_TTL = float(os.environ.get("VETO_PREFETCH_LEASE_TTL", 30))
+# Lease owner for the trades this worker process's feeder has taken
+PREFETCH_HOLDER = f"prefetch:{uuid.uuid4().hex}"
+
+# Request-path CV runs in its own process pool so it never ties up the event
+# loop; at most CV_CONCURRENCY requests wait on it, the rest queue cheaply
+CV_WORKERS = int(os.environ.get("VETO_CV_WORKERS", 2))
+CV_CONCURRENCY = int(os.environ.get("VETO_CV_CONCURRENCY", CV_WORKERS))
+CV_POOL = None
+CV_SLOTS = None
+
+# Seconds between checks for a client that hung up mid-request
+DISCONNECT_POLL = 0.25
+
+# Threads writing WEBP previews of screenshots into thumbnails/previews
+PREVIEW_WORKERS = int(os.environ.get("VETO_PREVIEW_WORKERS", 2))
+
+# Seconds between buffer scans, 0 disables hot ingestion
+INGEST_INTERVAL = float(os.environ.get("VETO_INGEST_INTERVAL", 2))
+
 for d in [ANNOTATED_DIR, MEDIA_DIR, THUMBNAILS_DIR]: d.mkdir(exist_ok=True)
 
-# Static Serving
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
-app.mount("/thumbnails", StaticFiles(directory=THUMBNAILS_DIR), name="thumbnails")
+# Metrics
+REGISTRY = Registry()
+REQUEST_SECONDS = Histogram(REGISTRY, "veto_request_seconds", "HTTP request latency by route.", ["method", "route", "status"])
+CV_SECONDS = Histogram(REGISTRY, "veto_cv_seconds", "Time spent in get_trade_data (cache hits included).", ["source"])
+NEXT_SCANNED = Histogram(REGISTRY, "veto_next_scanned_messages", "Index positions examined per /next trade.", buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 1024))
+ERRORS = Counter(REGISTRY, "veto_errors_total", "Errors by stage.", ["stage"])
+DUPLICATES = Counter(REGISTRY, "veto_duplicates_total", "Trades accepted by copying an identical screenshot's decision.", ["via"])
+
+class ObserveRequests:
+    """Per-route latency and status metrics.
+
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware reads
+    the client's disconnect message itself, so endpoints never saw it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        s = perf_counter()
+        status = 500
+
+        async def send_observed(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        except Exception:
+            ERRORS.labels("request").inc()
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                # Static mounts don't set a route; keep label cardinality bounded
+                path = scope["path"]
+                route = "/" + path.strip("/").split("/")[0] if path.startswith(("/media/", "/thumbnails/")) else "unmatched"
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(perf_counter() - s)
+
+app.add_middleware(ObserveRequests)
+
+# Static Serving; nothing under these mounts is ever rewritten in place
+app.mount("/media", CachedStaticFiles(directory=MEDIA_DIR), name="media")
+app.mount("/thumbnails", CachedStaticFiles(directory=THUMBNAILS_DIR), name="thumbnails")
+
+# Annotations live in SQLite; the old annotated/ dir is imported on first run
+STORE = AnnotationStore()
+if STORE.is_empty(): STORE.import_dir(ANNOTATED_DIR)
+
+# Trades handed out by /next are reserved per client, across worker processes
+LEASES = LeaseTable(STORE.path)
+LEASES.purge()
 
-# Load Messages once on startup
 MESSAGES = []
-if BUFFERS_DIR.exists():
-    for file_path in sorted(BUFFERS_DIR.glob("*.json"), key=lambda p: int(p.stem) if p.stem.isdigit() else 0):
-        with open(file_path, "r") as f:
-            MESSAGES += json.load(f)
+INDEX = StatusIndex(STORE)
 
 class ActionRequest(BaseModel):
     filename: str
@@ -43,41 +152,275 @@ class ActionRequest(BaseModel):
     metadata: Optional[dict] = None
 
 def get_status(filename: str) -> str:
-    if (ANNOTATED_DIR / f"{filename}.json").exists(): return "accepted"
-    if (ANNOTATED_DIR / f"{filename}.skipped").exists(): return "rejected"
-    return "pending"
+    return INDEX.get(filename)
+
+# Reposted screenshots get the decision already made on their original. Only
+# byte-identical copies of an accepted trade are decided automatically; a
+# near match by perceptual hash may be a different trade in the same window
+# layout, so it goes through review like any other
+PHASH = PerceptualIndex(MEDIA_DIR)
+
+def resolve_duplicate(filename: str, message_index: Optional[int] = None) -> bool:
+    """Copies an identical accepted screenshot's decision onto `filename`, if there is one."""
+    for other in PHASH.identical(filename):
+        if INDEX.get(other) != "accepted": continue
+        row = STORE.get(other)
+        if row is None: continue  # decided here but not committed yet
+        STORE.set(filename, "accepted", row["metadata"], message_index, duplicate_of=other)
+        INDEX.set(filename, "accepted")
+        DUPLICATES.labels("lookup").inc()
+        return True
+    return False
+
+def propagate_to_duplicates(filename: str, status: str, metadata):
+    """Applies a fresh acceptance to every still-pending identical screenshot."""
+    if status != "accepted": return
+    for other in PHASH.identical(filename):
+        # Repeat posts aren't in the review queue or its counts; leave them undecided
+        if other not in INDEX.position or INDEX.get(other) != "pending": continue
+        STORE.set(other, status, metadata, INDEX.message_index(other), duplicate_of=filename)
+        INDEX.set(other, status)
+        PREFETCH.release(other)
+        DUPLICATES.labels("action").inc()
+
+def next_candidate(skip):
+    # Leased trades are being (or were) extracted by whichever worker holds
+    # them; the lease is taken here so no other feeder starts on the same one
+    skip = skip | LEASES.active()
+    while candidate := INDEX.next_pending(skip):
+        if resolve_duplicate(candidate[1], candidate[0]): continue
+        if LEASES.acquire(candidate[1], PREFETCH_HOLDER, ttl=PREFETCH_LEASE_TTL): return candidate
+        skip.add(candidate[1])
+    return None
+
+PREFETCH = PrefetchPool(
+    next_candidate,
+    lambda filename: get_status(filename) == "pending",
+    MEDIA_DIR,
+    workers=PREFETCH_WORKERS,
+    depth=PREFETCH_DEPTH,
+    # A trade nobody acted on comes back when its lease runs out
+    served_ttl=LEASES.ttl,
+    retry_failed=PREFETCH_RETRY,
+)
+PREFETCH.on_extract = CV_SECONDS.labels("prefetch").observe
+# Keeps the feeder's reservations alive and frees the ones it dropped
+PREFETCH.on_hold = lambda filenames: LEASES.retain(PREFETCH_HOLDER, filenames, ttl=PREFETCH_LEASE_TTL)
+
+# Previews are built while the trade's CV runs, so both are ready together
+PREVIEWS = PreviewGenerator(MEDIA_DIR, THUMBNAILS_DIR, workers=PREVIEW_WORKERS)
+PREFETCH.on_schedule = PREVIEWS.schedule
+
+# Load Messages on startup, then pick up new buffers in the background
+TRADES = TradeIndex(MEDIA_DIR)
+
+def on_messages(new, start):
+    # Repeat posts of a trade never reach the review queue or the counters
+    INDEX.add_messages(new, start, duplicates=TRADES.add(new, start))
+    PHASH.schedule(msg[2][0] for msg in new if msg[2])
+    PREFETCH.wake()
+
+INGESTER = BufferIngester(BUFFERS_DIR, MESSAGES, on_messages, interval=INGEST_INTERVAL)
+INGESTER.scan()
+
+def synced_counts() -> dict:
+    # Picks up decisions committed by other worker processes (one indexed query)
+    INDEX.sync()
+    return INDEX.counts()
 
 @app.get("/stats")
-def get_stats():
-    accepted = len(list(ANNOTATED_DIR.glob("*.json")))
-    rejected = len(list(ANNOTATED_DIR.glob("*.skipped")))
-    total = len([m for m in MESSAGES if m[2]])
-    return {"accepted": accepted, "rejected": rejected, "remaining": total - (accepted + rejected)}
+async def get_stats(reconcile: bool = False):
+    """Live counters; pass `reconcile=true` to re-read the annotation store first."""
+    if reconcile: await run_in_threadpool(INDEX.load)
+    return await run_in_threadpool(synced_counts)
 
-@app.get("/next")
-def get_next_trade(exclude: List[str] = Query([])):
-    """Finds next trade not in 'exclude' list and not already on disk."""
-    for i, msg in enumerate(MESSAGES):
-        if not msg[2]: continue
-        filename = msg[2][0]
-        
-        # Skip if finished or currently in frontend buffer
-        if get_status(filename) == "pending" and filename not in exclude:
-            try:
-                img_path = MEDIA_DIR / filename
+class ClientDisconnected(Exception):
+    pass
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Awaits `coro`, cancelling it if the client goes away first."""
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL)
+        if done: return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise ClientDisconnected()
+
+async def run_cv(filename: str):
+    """Extracts `filename` on the CV pool, waiting for a free slot first."""
+    async with CV_SLOTS:
+        loop = asyncio.get_running_loop()
+        # Cancelling the await also cancels the job if it hasn't started yet
+        metadata, seconds = await loop.run_in_executor(CV_POOL, extract_timed, str(MEDIA_DIR / filename))
+    CV_SECONDS.labels("request").observe(seconds)
+    return metadata
+
+def lease(filename: str, client_id: str) -> bool:
+    """Reserves `filename` for `client_id` if nobody else holds or annotated it.
+
+    Blocks on SQLite; the request path calls it through run_in_threadpool.
+    """
+    if not LEASES.acquire(filename, client_id, take_from=PREFETCH_HOLDER): return False
+    # Another worker process may have annotated it since our index loaded
+    row = STORE.get(filename)
+    if row is not None:
+        INDEX.set(filename, row["status"])
+        LEASES.release([filename])
+        return False
+    return True
+
+async def take_next_trade(exclude: set, client_id: str) -> Optional[dict]:
+    """Pops a prefetched trade, falling back to inline CV on a queue miss.
+
+    Whatever is returned is leased to `client_id`; `exclude` should already
+    hold the filenames leased to other clients.
+    """
+    while trade := PREFETCH.pop(exclude):
+        if await run_in_threadpool(lease, trade["filename"], client_id):
+            NEXT_SCANNED.observe(0)
+            return trade
+        PREFETCH.release(trade["filename"])
+        exclude.add(trade["filename"])
+
+    skip = exclude | PREFETCH.skip_set()
+    scanned_total = 0
+    while True:
+        candidate, scanned = INDEX.scan_pending(skip)
+        scanned_total += scanned
+        if candidate is None: break
+        i, filename = candidate
+        if await run_in_threadpool(resolve_duplicate, filename, i): continue
+        if not await run_in_threadpool(lease, filename, client_id):
+            skip.add(filename)
+            continue
+        try:
+            # Reuse the background result if a worker is already on it
+            future = PREFETCH.claim(filename)
+            if future is not None:
+                # Shielded: the prefetch pool still wants it if we're cancelled
+                metadata, _ = await asyncio.shield(asyncio.wrap_future(future))
+            else:
                 # Heavy CV Operation
-                metadata = proofreader.get_trade_data(str(img_path))
-                return {"message_index": i, "filename": filename, "metadata": metadata}
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                continue
+                metadata = await run_cv(filename)
+            NEXT_SCANNED.observe(scanned_total)
+            return {"message_index": i, "filename": filename, "metadata": metadata}
+        except asyncio.CancelledError:
+            PREFETCH.release(filename)
+            await run_in_threadpool(LEASES.release, [filename], client_id)
+            raise
+        except Exception as e:
+            ERRORS.labels("cv").inc()
+            PREFETCH.release(filename)
+            await run_in_threadpool(LEASES.release, [filename], client_id)
+            print(f"Error processing {filename}: {e}")
+            skip.add(filename)
+    NEXT_SCANNED.observe(scanned_total)
     return None
 
+def with_previews(trade: Optional[dict]) -> Optional[dict]:
+    if trade is None: return None
+    return {**trade, "previews": PREVIEWS.previews(trade["filename"])}
+
+def preload_header(trades) -> str:
+    images = []
+    for trade in trades:
+        srcset = ", ".join(f"{p['url']} {p['width']}w" for p in trade["previews"])
+        images.append((f"/media/{trade['filename']}", srcset or None))
+    return preload_links(images)
+
+async def collect_trades(exclude: set, count: int, trades: list, client_id: str):
+    while len(trades) < count and (trade := await take_next_trade(exclude, client_id)):
+        trades.append(with_previews(trade))
+        exclude.add(trade["filename"])
+
+def client_id_of(request: Request, client: Optional[str]) -> str:
+    return client or request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+@app.get("/next")
+async def get_next_trade(request: Request, response: Response, exclude: List[str] = Query([]),
+                         count: Optional[int] = Query(None, ge=1, le=50), client: Optional[str] = Query(None)):
+    """Next trade not in 'exclude', or a list of up to `count` distinct ones.
+
+    Each trade carries `previews`: [{"url", "width"}] of the resized copies
+    ready so far, ending with the full screenshot. A `Link` header lists the
+    same images as preloads. If the client disconnects first, pending CV is
+    cancelled and every trade taken for it goes back to the queue.
+
+    Trades are leased to the caller (`client` param or X-Client-Id header)
+    until acted on or VETO_LEASE_TTL runs out; each call renews them.
+    """
+    client_id = client_id_of(request, client)
+    PREFETCH.touch(await run_in_threadpool(LEASES.renew, client_id))
+    # Our own feeder's trades stay eligible: they are handed over, not skipped
+    exclude = set(exclude) | await run_in_threadpool(LEASES.held_by_others, client_id, PREFETCH_HOLDER)
+
+    trades = []
+    try:
+        await cancel_on_disconnect(request, collect_trades(exclude, count or 1, trades, client_id))
+    except ClientDisconnected:
+        for trade in trades: PREFETCH.release(trade["filename"])
+        await run_in_threadpool(LEASES.release, [trade["filename"] for trade in trades], client_id)
+        return Response(status_code=499)
+
+    if trades: response.headers["Link"] = preload_header(trades)
+    if count is None: return trades[0] if trades else None
+    return trades
+
+@app.get("/prefetch")
+async def get_prefetch_stats():
+    leases = await run_in_threadpool(LEASES.stats)
+    return {**PREFETCH.stats(), "previews": PREVIEWS.stats(), "leases": leases, "phash": PHASH.stats(), "trades": TRADES.stats()}
+
+# Gauges are read at scrape time, so they cost nothing between scrapes
+Gauge(REGISTRY, "veto_prefetch", "Prefetch pool state.", ["field"], fn=PREFETCH.stats)
+Gauge(REGISTRY, "veto_previews", "Preview generator state.", ["field"], fn=PREVIEWS.stats)
+Gauge(REGISTRY, "veto_trade_index", "Trade-level dedup of buffer messages.", ["field"], fn=TRADES.stats)
+Gauge(REGISTRY, "veto_phash", "Perceptual hash index state.", ["field"], fn=PHASH.stats)
+Gauge(REGISTRY, "veto_leases", "Unexpired trade leases, across all workers.", ["field"], fn=LEASES.stats)
+Gauge(REGISTRY, "veto_cv_cache", "CV result cache state (this process).", ["field"],
+      fn=lambda: {k: v for k, v in cv_cache.default_cache().stats().items() if k != "version"})
+Gauge(REGISTRY, "veto_annotations", "Annotation counters.", ["status"], fn=synced_counts)
+Gauge(REGISTRY, "veto_annotation_write_queue", "Annotation writes waiting to be committed.", fn=STORE.pending_writes)
+Gauge(REGISTRY, "veto_messages", "Messages loaded from buffers.", fn=lambda: len(MESSAGES))
+
+@app.get("/metrics")
+async def get_metrics():
+    # Some gauges (leases) read SQLite
+    return Response(await run_in_threadpool(REGISTRY.render), media_type=Registry.CONTENT_TYPE)
+
+def apply_action(req: ActionRequest) -> int:
+    """Queues the decision; returns its store ticket."""
+    status = "accepted" if req.action == "accept" else "rejected"
+    metadata = req.metadata if status == "accepted" else None
+    ticket = STORE.set(req.filename, status, metadata, req.message_index)
+    INDEX.set(req.filename, status)
+    PREFETCH.release(req.filename)
+    propagate_to_duplicates(req.filename, status, metadata)
+    return ticket
+
+async def commit(tickets):
+    """Waits for `tickets` to be stored; 503 if any wasn't, so the client resends."""
+    try:
+        await run_in_threadpool(STORE.flush, tickets)
+    except sqlite3.Error as e:
+        ERRORS.labels("store").inc()
+        raise HTTPException(status_code=503, detail=f"decision not stored: {e}")
+
 @app.post("/action")
-def perform_action(req: ActionRequest):
-    if req.action == "accept":
-        with open(ANNOTATED_DIR / f"{req.filename}.json", "w") as f:
-            json.dump(req.metadata, f, indent=2)
-    else:
-        (ANNOTATED_DIR / f"{req.filename}.skipped").touch()
-    return {"status": "ok"}
\ No newline at end of file
+async def perform_action(req: ActionRequest):
+    # Off the loop: finding identical screenshots may hash files
+    ticket = await run_in_threadpool(apply_action, req)
+    # Committed first: another worker that leases it next must see the decision
+    await commit([ticket])
+    await run_in_threadpool(LEASES.release, [req.filename])
+    return {"status": "ok"}
+
+@app.post("/actions")
+async def perform_actions(reqs: List[ActionRequest]):
+    """Applies a batch of decisions and returns the updated stats."""
+    tickets = await run_in_threadpool(lambda: [apply_action(req) for req in reqs])
+    await commit(tickets)
+    await run_in_threadpool(LEASES.release, [req.filename for req in reqs])
+    return {"status": "ok", "applied": len(reqs), "stats": await run_in_threadpool(synced_counts)}
\ No newline at end of file
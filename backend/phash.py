@@ -0,0 +1,269 @@
+import os
+import sys
+import queue
+import hashlib
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from time import perf_counter
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+CACHE_PATH = Path(__file__).parent / "cache" / "phash.sqlite"
+HASH_SIZE = 16  # 16x16 difference hash, 256 bits
+# Reposts differ by a few bits of re-encoding noise. Trade windows share most
+# of their layout and item icons are small, so a match this close is only a
+# candidate: main.py copies decisions for byte-identical files alone
+MAX_DISTANCE = int(os.environ.get("VETO_PHASH_DISTANCE", 6))
+
+
+def dhash(image, hash_size=HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair."""
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_file(path, hash_size=HASH_SIZE) -> int:
+    with Image.open(path) as image:
+        return dhash(image, hash_size)
+
+
+@lru_cache(maxsize=65536)
+def _content_digest(path, mtime_ns, size) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_digest(path):
+    """Hash of the file's bytes, memoized per (path, mtime, size); None if unreadable."""
+    try:
+        st = os.stat(path)
+        return _content_digest(os.fspath(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class MultiIndex:
+    """Hamming-distance search by the pigeonhole principle.
+
+    Hashes are cut into `max_distance + 1` chunks, each with its own exact
+    lookup table. Two hashes within `max_distance` bits must agree exactly on
+    at least one chunk, so a query only verifies the few keys that share a
+    chunk with it instead of every hash in the index.
+    """
+
+    def __init__(self, bits, max_distance):
+        self.bits = bits
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        edges = [round(i * bits / chunks) for i in range(chunks + 1)]
+        self.spans = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.tables = [{} for _ in self.spans]
+        self.hashes = {}
+
+    def add(self, key, h):
+        if key in self.hashes: self.remove(key)
+        self.hashes[key] = h
+        for table, (shift, mask) in zip(self.tables, self.spans):
+            table.setdefault((h >> shift) & mask, set()).add(key)
+
+    def remove(self, key):
+        h = self.hashes.pop(key, None)
+        if h is None: return
+        for table, (shift, mask) in zip(self.tables, self.spans):
+            bucket = table.get((h >> shift) & mask)
+            if bucket is None: continue
+            bucket.discard(key)
+            if not bucket: del table[(h >> shift) & mask]
+
+    def search(self, h, max_distance=None) -> list:
+        """[(distance, key)] within `max_distance` (at most the built one), nearest first."""
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = set()
+        for table, (shift, mask) in zip(self.tables, self.spans):
+            candidates |= table.get((h >> shift) & mask, set())
+        found = []
+        for key in candidates:
+            d = hamming(h, self.hashes[key])
+            if d <= limit: found.append((d, key))
+        return sorted(found)
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class PerceptualIndex:
+    """Persistent perceptual hashes of `media/`, searchable by Hamming distance.
+
+    Hashes are stored in SQLite with each file's size and mtime, so only new
+    or rewritten screenshots are ever decoded again. `schedule` hands files
+    to a background thread; `update` hashes a batch on a thread pool and is
+    what the batch scripts use.
+    """
+
+    def __init__(self, media_dir, path=CACHE_PATH, max_distance=MAX_DISTANCE, hash_size=HASH_SIZE):
+        self.media_dir = Path(media_dir)
+        self.path = Path(path)
+        self.hash_size = hash_size
+        self.index = MultiIndex(hash_size * hash_size, max_distance)
+        self.stamps = {}  # filename -> (size, mtime_ns) the hash was taken at
+        self.errors = 0
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "filename TEXT PRIMARY KEY, hash TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash_size INTEGER NOT NULL)"
+        )
+        rows = self._conn.execute("SELECT filename, hash, size, mtime_ns FROM hashes WHERE hash_size = ?", (hash_size,))
+        for filename, h, size, mtime_ns in rows:
+            self.index.add(filename, int(h, 16))
+            self.stamps[filename] = (size, mtime_ns)
+
+    # --- Hashing ---
+    def _stale(self, filename):
+        """The file's current (size, mtime_ns) if its hash needs (re)computing, else None."""
+        try:
+            st = (self.media_dir / filename).stat()
+        except OSError:
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+        return None if self.stamps.get(filename) == stamp else stamp
+
+    def _compute(self, filename):
+        stamp = self._stale(filename)
+        if stamp is None: return None
+        try:
+            return filename, hash_file(self.media_dir / filename, self.hash_size), stamp
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Could not hash {filename}: {e}")
+            return None
+
+    def _save(self, results):
+        results = [r for r in results if r is not None]
+        if not results: return
+        with self._lock:
+            for filename, h, stamp in results:
+                self.index.add(filename, h)
+                self.stamps[filename] = stamp
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                    [(f, format(h, "x"), size, mtime, self.hash_size) for f, h, (size, mtime) in results],
+                )
+
+    def update(self, filenames, workers=None) -> int:
+        """Hashes every file in `filenames` that's new or changed; returns how many."""
+        todo = [f for f in filenames if self._stale(f) is not None]
+        if not todo: return 0
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            results = list(pool.map(self._compute, todo))
+        self._save(results)
+        return sum(1 for r in results if r is not None)
+
+    # --- Background ---
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._run, name="phash", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread: return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def schedule(self, filenames):
+        for filename in filenames:
+            self._queue.put(filename)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._save([self._compute(f) for f in batch if f is not None])
+            if stop: return
+
+    # --- Queries ---
+    def hash_of(self, filename):
+        return self.index.hashes.get(filename)
+
+    def near(self, filename, max_distance=None) -> list:
+        """[(distance, filename)] of other screenshots within `max_distance` bits."""
+        with self._lock:
+            h = self.index.hashes.get(filename)
+            if h is None: return []
+            return [(d, f) for d, f in self.index.search(h, max_distance) if f != filename]
+
+    def identical(self, filename) -> list:
+        """Other screenshots with exactly the same bytes as `filename`.
+
+        Identical files share a dHash, so only the distance-0 bucket is read
+        from disk to confirm.
+        """
+        digest = content_digest(self.media_dir / filename)
+        if digest is None: return []
+        return [f for _, f in self.near(filename, 0) if content_digest(self.media_dir / f) == digest]
+
+    def stats(self):
+        with self._lock:
+            return {"hashed": len(self.index), "queued": self._queue.qsize(), "errors": self.errors}
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash media/ and report near-duplicate screenshots")
+    parser.add_argument("--media", type=Path, default=Path(__file__).parent / "media")
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE)
+    parser.add_argument("--show", type=int, default=20)
+    args = parser.parse_args()
+
+    index = PerceptualIndex(args.media, max_distance=args.max_distance)
+    files = sorted(p.name for p in args.media.iterdir() if p.is_file())
+    s = perf_counter()
+    hashed = index.update(files)
+    print(f"{len(files)} screenshots, {hashed} hashed in {perf_counter() - s:.1f}s ({len(files) - hashed} already indexed)")
+
+    s = perf_counter()
+    pairs = {tuple(sorted((f, other))): d for f in files for d, other in index.near(f)}
+    elapsed = perf_counter() - s
+    print(f"{len(pairs)} near-duplicate pairs within {args.max_distance} bits ({elapsed * 1e6 / max(len(files), 1):.0f}us per query)")
+    for (a, b), d in sorted(pairs.items(), key=lambda p: p[1])[:args.show]:
+        print(f"  {d:>2}  {a}  {b}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import time
+import threading
+from time import perf_counter
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv_cache
+
+
+def extract_timed(path):
+    """Runs inside a worker process: (metadata, seconds spent)."""
+    s = perf_counter()
+    metadata = cv_cache.get_trade_data(path)
+    return metadata, perf_counter() - s
+
+
+class PrefetchPool:
+    """Keeps running CV ahead of the reviewers into a bounded ready-queue.
+
+    `next_candidate(skip)` returns the next pending `(message_index, filename)`
+    not in `skip`, or None. `is_pending(filename)` is checked again on pop so
+    trades annotated while queued are dropped instead of served.
+    `on_extract(seconds)`, if set, is called with each worker's CV time,
+    `on_schedule(filename)` whenever a trade is queued for extraction, and
+    `on_hold(filenames)` from the feeder about once a second with every trade
+    the pool is extracting, holding or has handed out (see `holding`).
+
+    A trade handed to a client that never acts on it (closed tab, reload) is
+    served again once `served_ttl` seconds pass; a trade whose CV raised is
+    retried in the background after `retry_failed` seconds, and the request
+    path is free to retry it inline at any time.
+    """
+
+    def __init__(self, next_candidate, is_pending, media_dir, workers=2, depth=8, served_ttl=300, retry_failed=60):
+        self.next_candidate = next_candidate
+        self.is_pending = is_pending
+        self.media_dir = media_dir
+        self.workers = workers
+        self.depth = depth
+        self.served_ttl = served_ttl
+        self.retry_failed = retry_failed
+        self.on_extract = None
+        self.on_schedule = None
+        self.on_hold = None
+
+        self.ready = OrderedDict()  # filename -> trade payload
+        self.in_flight = {}         # filename -> (message_index, future)
+        self.served = {}            # filename -> when it was handed to a client, waiting for /action
+        self.failed = {}            # filename -> when CV raised; not retried in the background until retry_failed
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    # --- Lifecycle ---
+    def start(self):
+        if self.workers <= 0 or self._thread: return
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._thread = threading.Thread(target=self._run, name="prefetch-feeder", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._fill()
+            if self.on_hold: self.on_hold(self.holding())
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+
+    def _fill(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if len(self.ready) + len(self.in_flight) >= self.depth: return
+                candidate = self.next_candidate(self.skip_set() | self.failed.keys() | self.in_flight.keys())
+                if candidate is None: return
+                index, filename = candidate
+                try:
+                    future = self._executor.submit(extract_timed, str(self.media_dir / filename))
+                except RuntimeError:
+                    return  # executor shutting down
+                self.in_flight[filename] = (index, future)
+            future.add_done_callback(lambda f, name=filename: self._done(name, f))
+            if self.on_schedule: self.on_schedule(filename)
+
+    def _done(self, filename, future):
+        with self._lock:
+            index, _ = self.in_flight.pop(filename, (None, None))
+            if future.cancelled() or index is None: return
+            try:
+                metadata, seconds = future.result()
+                if self.on_extract: self.on_extract(seconds)
+            except Exception as e:
+                self.errors += 1
+                self.failed[filename] = time.monotonic()
+                print(f"Error processing {filename}: {e}")
+            else:
+                # A client may have claimed it while it was still running
+                if filename not in self.served:
+                    self.ready[filename] = {"message_index": index, "filename": filename, "metadata": metadata}
+        self._wake.set()
+
+    # --- Request path ---
+    def _expire(self):
+        now = time.monotonic()
+        for entries, ttl in ((self.served, self.served_ttl), (self.failed, self.retry_failed)):
+            for filename in [f for f, at in entries.items() if now - at >= ttl]:
+                del entries[filename]
+
+    def holding(self):
+        """Filenames in flight, ready or served and not yet released."""
+        with self._lock:
+            self._expire()
+            return self.in_flight.keys() | self.ready.keys() | self.served.keys()
+
+    def skip_set(self):
+        """Filenames the request path should not pick up itself."""
+        with self._lock:
+            self._expire()
+            return self.served.keys() | self.ready.keys()
+
+    def pop(self, exclude=()):
+        """Returns a finished trade not in `exclude`, or None on a miss."""
+        with self._lock:
+            for filename in list(self.ready):
+                if filename in exclude: continue
+                trade = self.ready.pop(filename)
+                if not self.is_pending(filename): continue
+                self.served[filename] = time.monotonic()
+                self.hits += 1
+                self._wake.set()
+                return trade
+            self.misses += 1
+            return None
+
+    def claim(self, filename):
+        """Marks `filename` as handed out; returns its in-flight future, if any."""
+        with self._lock:
+            self.served[filename] = time.monotonic()
+            self.failed.pop(filename, None)
+            self.ready.pop(filename, None)
+            entry = self.in_flight.get(filename)
+            return entry[1] if entry else None
+
+    def touch(self, filenames):
+        """Restarts the served clock of `filenames`, e.g. when their client renews its leases."""
+        now = time.monotonic()
+        with self._lock:
+            for filename in filenames:
+                if filename in self.served: self.served[filename] = now
+
+    def release(self, filename):
+        """Called once a trade has been annotated."""
+        with self._lock:
+            self.served.pop(filename, None)
+            self.ready.pop(filename, None)
+        self._wake.set()
+
+    def wake(self):
+        """Tells the feeder there may be new pending trades."""
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers if self._executor else 0,
+                "depth": self.depth,
+                "ready": len(self.ready),
+                "in_flight": len(self.in_flight),
+                "served": len(self.served),
+                "failed": len(self.failed),
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+            }
@@ -0,0 +1,158 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = os.environ.get("VETO_USERS_API", "https://users.roblox.com")
+CACHE_PATH = Path(__file__).parent / "cache" / "usernames.sqlite"
+BATCH_SIZE = 200  # the usernames endpoint rejects more than this per request
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Spaces calls at least `1 / rate` seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+
+class UsernameResolver:
+    """Resolves usernames to user records in 200-name batches.
+
+    Batches go out concurrently over one pooled session, rate limited and
+    retried with exponential backoff on 429/5xx and connection errors. Every
+    answer, including "no such user", is cached in SQLite so repeat runs only
+    query names they haven't seen.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, cache_path=CACHE_PATH, concurrency=4, rate=5.0,
+                 max_retries=5, backoff=0.5, timeout=10.0, batch_size=BATCH_SIZE):
+        self.url = base_url.rstrip("/") + "/v1/usernames/users"
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usernames ("
+            "requested TEXT PRIMARY KEY, user_id INTEGER, name TEXT, display_name TEXT, resolved_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def cached(self, names) -> dict:
+        """{name: record or None} for the names already in the cache."""
+        found = {}
+        names = list(names)
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT requested, user_id, name, display_name FROM usernames WHERE requested IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for requested, user_id, name, display_name in rows:
+                found[requested] = _record(user_id, name, display_name)
+        return found
+
+    def resolve(self, names, retry_unresolved=False) -> dict:
+        """{lowercased name: {"id", "name", "displayName"} or None}."""
+        names = sorted({n.lower() for n in names if n})
+        results = self.cached(names)
+        if retry_unresolved:
+            results = {k: v for k, v in results.items() if v is not None}
+
+        todo = [n for n in names if n not in results]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        if batches:
+            print(f"Resolving {len(todo)} names in {len(batches)} batches ({len(results)} cached)")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._fetch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    resolved = future.result()
+                except Exception as e:
+                    # Left uncached so the next run asks again
+                    print(f"Batch of {len(batch)} names failed: {e}")
+                    continue
+                self._store(batch, resolved)
+                for name in batch:
+                    results[name] = resolved.get(name)
+        return results
+
+    def _fetch(self, batch) -> dict:
+        payload = {"usernames": batch, "excludeBannedUsers": False}
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries: raise
+                self._sleep(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep(attempt, response.headers.get("Retry-After"))
+                continue
+            response.raise_for_status()
+
+            resolved = {}
+            for user in response.json().get("data", []):
+                requested = (user.get("requestedUsername") or user.get("name") or "").lower()
+                resolved[requested] = _record(user.get("id"), user.get("name"), user.get("displayName"))
+            return resolved
+
+    def _sleep(self, attempt, retry_after: Optional[str] = None):
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.backoff * 2 ** attempt
+        time.sleep(delay + random.uniform(0, self.backoff))
+
+    def _store(self, batch, resolved):
+        now = time.time()
+        rows = []
+        for name in batch:
+            record = resolved.get(name)
+            if record is None:
+                rows.append((name, None, None, None, now))
+            else:
+                rows.append((name, record["id"], record["name"], record["displayName"], now))
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO usernames VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        self.session.close()
+        self._conn.close()
+
+
+def _record(user_id, name, display_name):
+    if user_id is None: return None
+    return {"id": user_id, "name": name, "displayName": display_name}
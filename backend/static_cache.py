@@ -0,0 +1,64 @@
+import os
+import stat
+from functools import lru_cache
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from cv_cache import file_digest
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@lru_cache(maxsize=65536)
+def _content_etag(path, mtime_ns, size) -> str:
+    # mtime and size are part of the key so a rewritten file is hashed again
+    return f'"{file_digest(path)}"'
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles for files that never change once written.
+
+    Screenshots are uuid-named and previews are derived from them, so every
+    response can be cached forever (`immutable` also stops the browser from
+    revalidating on reload). The ETag is a hash of the file's bytes, not of
+    its mtime, so it stays valid after a copy or re-download. FileResponse
+    serves Range/If-Range requests against it; If-None-Match gets a 304.
+    """
+
+    def __init__(self, *args, cache_control=IMMUTABLE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def lookup_path(self, path):
+        # StaticFiles runs this on a worker thread; hashing here keeps the
+        # first request for a file from reading all of it on the event loop
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result and stat.S_ISREG(stat_result.st_mode):
+            _content_etag(os.fspath(full_path), stat_result.st_mtime_ns, stat_result.st_size)
+        return full_path, stat_result
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code=200) -> Response:
+        headers = {
+            "cache-control": self.cache_control,
+            "etag": _content_etag(os.fspath(full_path), stat_result.st_mtime_ns, stat_result.st_size),
+        }
+        response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def preload_links(images, sizes="55vw", limit=8) -> str:
+    """A `Link` header value asking the client to preload each image.
+
+    `images` holds (src, srcset) pairs; srcset may be None. With a srcset and
+    the <img>'s `sizes`, the browser preloads the candidate it will pick.
+    """
+    links = []
+    for src, srcset in list(images)[:limit]:
+        link = f"<{src}>; rel=preload; as=image"
+        if srcset: link += f'; imagesrcset="{srcset}"; imagesizes="{sizes}"'
+        links.append(link)
+    return ", ".join(links)
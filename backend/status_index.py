@@ -0,0 +1,121 @@
+import threading
+from typing import Optional
+
+
+class StatusIndex:
+    """In-memory annotation status for every buffered attachment.
+
+    The annotation store is read once; after that `/action` keeps it current
+    via `set`. Pending lookups walk a "next unannotated position" forest with path
+    compression, so finding the next pending trade costs O(1 + len(skip))
+    amortized instead of a scan over every message with two stats each.
+    Accepted/rejected/total counters are kept alongside so `/stats` never
+    scans the store; `load()` reconciles everything with it. With several
+    worker processes, `sync()` applies the decisions other workers committed,
+    read by `seq` from an index, so every worker reports the same counts.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.status = {}     # filename -> "accepted" | "rejected"
+        self.order = []      # (message_index, filename), first occurrence of each attachment
+        self.position = {}   # filename -> index into order
+        self._next = [0]     # next possibly-pending position; order[len(order)] is the sentinel
+        self.accepted = 0
+        self.rejected = 0
+        self.total = 0       # messages with an attachment, reposted attachments included
+        self.duplicates = 0  # messages skipped as repeat posts of an earlier trade
+        self.seq = 0         # store changes up to here are reflected
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.store.flush()
+        # Read first: a change landing in between is just applied again by sync()
+        seq = self.store.last_seq()
+        status = self.store.status_map()
+
+        with self._lock:
+            self.status = status
+            self.accepted = sum(1 for s in status.values() if s == "accepted")
+            self.rejected = len(status) - self.accepted
+            self.seq = seq
+            self._next = list(range(len(self.order) + 1))
+            for p, (_, filename) in enumerate(self.order):
+                if filename in status: self._next[p] = p + 1
+
+    def add_messages(self, messages, start=0, duplicates=()):
+        """Indexes `messages`, whose first element sits at MESSAGES[start].
+
+        Message indices in `duplicates` repeat an earlier trade; they are
+        neither counted nor queued for review.
+        """
+        with self._lock:
+            for i, msg in enumerate(messages, start):
+                if not msg[2]: continue
+                if i in duplicates:
+                    self.duplicates += 1
+                    continue
+                self.total += 1
+                filename = msg[2][0]
+                if filename in self.position: continue
+                p = len(self.order)
+                self.order.append((i, filename))
+                self.position[filename] = p
+                # Old sentinel becomes position p; append the new sentinel
+                self._next.append(p + 1)
+                if filename in self.status: self._next[p] = p + 1
+
+    def get(self, filename: str) -> str:
+        return self.status.get(filename, "pending")
+
+    def message_index(self, filename: str) -> Optional[int]:
+        """Index of the first message carrying `filename`, if buffered."""
+        p = self.position.get(filename)
+        return self.order[p][0] if p is not None else None
+
+    def set(self, filename: str, status: str):
+        with self._lock:
+            previous = self.status.get(filename)
+            if previous == "accepted": self.accepted -= 1
+            elif previous == "rejected": self.rejected -= 1
+            if status == "accepted": self.accepted += 1
+            else: self.rejected += 1
+            self.status[filename] = status
+            p = self.position.get(filename)
+            if p is not None: self._next[p] = p + 1
+
+    def sync(self) -> int:
+        """Applies store changes committed since the last load/sync; returns how many."""
+        changes = self.store.changes(self.seq)
+        for seq, filename, status in changes:
+            self.set(filename, status)
+            self.seq = max(self.seq, seq)
+        return len(changes)
+
+    def counts(self) -> dict:
+        with self._lock:
+            done = self.accepted + self.rejected
+            return {"accepted": self.accepted, "rejected": self.rejected, "remaining": self.total - done, "duplicates": self.duplicates}
+
+    def next_pending(self, skip=()) -> Optional[tuple]:
+        """Returns the first pending `(message_index, filename)` not in `skip`."""
+        return self.scan_pending(skip)[0]
+
+    def scan_pending(self, skip=()) -> tuple:
+        """Like `next_pending`, also returning how many positions were examined."""
+        with self._lock:
+            p = self._find(0)
+            scanned = 1
+            while p < len(self.order) and self.order[p][1] in skip:
+                p = self._find(p + 1)
+                scanned += 1
+            return (self.order[p] if p < len(self.order) else None), scanned
+
+    def _find(self, p):
+        root = p
+        while self._next[root] != root:
+            root = self._next[root]
+        while self._next[p] != root:
+            self._next[p], p = root, self._next[p]
+        return root
@@ -0,0 +1,161 @@
+import os
+import sys
+import argparse
+import threading
+from pathlib import Path
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+WIDTHS = tuple(int(w) for w in os.environ.get("VETO_PREVIEW_WIDTHS", "480,960,1440").split(","))
+QUALITY = int(os.environ.get("VETO_PREVIEW_QUALITY", 80))
+
+
+class PreviewGenerator:
+    """Writes downscaled WEBP copies of trade screenshots for the reviewer UI.
+
+    Previews live under `<thumbnails>/previews/` (the top level holds item
+    icons) as `<stem>-<width>.webp`, one per configured width narrower than
+    the screenshot. `schedule` queues a file on a small thread pool — Pillow
+    drops the GIL while decoding, resizing and encoding — so previews are
+    built alongside the CV prefetch, ahead of the review cursor. `previews`
+    only lists files that already exist, so a client never gets a 404 and
+    falls back to the full screenshot.
+    """
+
+    def __init__(self, media_dir, thumbnails_dir, widths=WIDTHS, quality=QUALITY, workers=2,
+                 url_prefix="/thumbnails/previews", media_url="/media"):
+        self.media_dir = Path(media_dir)
+        self.out_dir = Path(thumbnails_dir) / "previews"
+        self.url_prefix = url_prefix.rstrip("/")
+        self.media_url = media_url.rstrip("/")
+        self.widths = sorted(set(widths))
+        self.quality = quality
+        self.workers = workers
+
+        self.sizes = {}      # filename -> (width, height) of the original
+        self.scheduled = set()
+        self.generated = 0
+        self.errors = 0
+
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if self.workers > 0 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="previews")
+
+    def stop(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def path(self, filename, width) -> Path:
+        return self.out_dir / f"{Path(filename).stem}-{width}.webp"
+
+    def schedule(self, filename):
+        """Queues preview generation for `filename` unless already queued."""
+        with self._lock:
+            if self._executor is None or filename in self.scheduled: return
+            self.scheduled.add(filename)
+            try:
+                self._executor.submit(self._generate_logged, filename)
+            except RuntimeError:
+                self.scheduled.discard(filename)  # executor shutting down
+
+    def _generate_logged(self, filename):
+        try:
+            return self.generate(filename)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Preview failed for {filename}: {e}")
+
+    def generate(self, filename) -> list:
+        """Writes any missing previews for `filename`; returns their widths."""
+        with Image.open(self.media_dir / filename) as image:
+            size = image.size
+            widths = [w for w in self.widths if w < size[0]]
+            missing = [w for w in widths if not self.path(filename, w).exists()]
+            if missing:
+                image.load()
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+                # Largest first, each shrunk from the previous: less work per step
+                source = image
+                for width in reversed(missing):
+                    height = max(1, round(size[1] * width / size[0]))
+                    source = source.resize((width, height), Image.LANCZOS)
+                    out = self.path(filename, width)
+                    tmp = out.with_suffix(".tmp")
+                    source.save(tmp, "WEBP", quality=self.quality, method=4)
+                    os.replace(tmp, out)
+        with self._lock:
+            self.sizes[filename] = size
+            self.generated += len(missing)
+        return widths
+
+    def previews(self, filename) -> list:
+        """[{"url", "width"}] for the previews of `filename` ready right now.
+
+        The full screenshot is listed last with its own width, so a srcset
+        built from this still has the sharpest version for wide viewports.
+        """
+        found = []
+        for width in self.widths:
+            path = self.path(filename, width)
+            if path.exists():
+                found.append({"url": f"{self.url_prefix}/{path.name}", "width": width})
+        if not found:
+            self.schedule(filename)
+            return found
+
+        size = self.sizes.get(filename)
+        if size is None:
+            # Previews from an earlier run; opening only reads the header
+            try:
+                with Image.open(self.media_dir / filename) as image:
+                    size = self.sizes[filename] = image.size
+            except OSError:
+                return found
+        found.append({"url": f"{self.media_url}/{filename}", "width": size[0]})
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers if self._executor else 0,
+                "scheduled": len(self.scheduled),
+                "generated": self.generated,
+                "errors": self.errors,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate WEBP previews for every screenshot in media/")
+    parser.add_argument("--media", type=Path, default=Path(__file__).parent / "media")
+    parser.add_argument("--thumbnails", type=Path, default=Path(__file__).parent / "thumbnails")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    generator = PreviewGenerator(args.media, args.thumbnails, workers=0)
+    generator.out_dir.mkdir(parents=True, exist_ok=True)
+    files = sorted(p.name for p in args.media.iterdir() if p.is_file())
+
+    s = perf_counter()
+    source_bytes = preview_bytes = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for filename, widths in zip(files, pool.map(generator._generate_logged, files)):
+            if not widths: continue
+            source_bytes += (args.media / filename).stat().st_size
+            preview_bytes += generator.path(filename, widths[-1]).stat().st_size
+    print(f"{len(files)} screenshots, {generator.generated} previews written in {perf_counter() - s:.1f}s ({generator.errors} failed)")
+    if source_bytes:
+        print(f"Largest previews are {preview_bytes / source_bytes:.0%} of the original bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
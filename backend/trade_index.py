@@ -0,0 +1,97 @@
+import sys
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from time import perf_counter
+
+from dates import parse_date_value
+from decoding import decode_messages
+from usernames import fold, plausible
+
+
+class TradeIndex:
+    """Groups buffer messages that post the same trade.
+
+    A trade is keyed on (sender, receiver, date, attachment): names are
+    OCR-folded (`usernames.fold`), the date is resolved against the message
+    time, and the attachment is identified by its byte size, which is
+    identical for a re-upload of the same file under a new name and costs one
+    stat. Re-encoded reposts are left to `phash`. Messages missing a field,
+    or whose screenshot isn't downloaded yet, can't be matched and always
+    count as their own trade.
+    """
+
+    def __init__(self, media_dir):
+        self.media_dir = Path(media_dir)
+        self.canonical = {}   # trade key -> message_index of its first post
+        self.duplicate_of = {}  # message_index -> message_index of the first post
+        self.kept_files = set()    # attachments of messages counted as their own trade
+        self.repeat_files = set()  # attachments of repeat posts
+        self._lock = threading.Lock()
+
+    def key(self, message, info):
+        sender, receiver, raw_date = info["sender"], info["receiver"], info["date"]
+        if not (plausible(sender) and plausible(receiver) and raw_date): return None
+        date = parse_date_value(raw_date, message[1])
+        if date is None: return None
+        try:
+            size = (self.media_dir / message[2][0]).stat().st_size
+        except OSError:
+            return None
+        return fold(sender), fold(receiver), date, size
+
+    def add(self, messages, start=0, decoded=None) -> set:
+        """Indexes `messages` (the first at MESSAGES[start]); returns the duplicates' indices."""
+        messages = list(messages)
+        infos = decoded if decoded is not None else decode_messages(messages)
+        duplicates = set()
+        with self._lock:
+            for i, (message, info) in enumerate(zip(messages, infos), start):
+                if not message[2]: continue
+                key = self.key(message, info)
+                first = i if key is None else self.canonical.setdefault(key, i)
+                if first != i:
+                    self.duplicate_of[i] = first
+                    duplicates.add(i)
+                    self.repeat_files.add(message[2][0])
+                else:
+                    self.kept_files.add(message[2][0])
+        return duplicates
+
+    def duplicate_filenames(self) -> set:
+        """Attachments only ever seen on repeat posts, e.g. to filter per-filename annotations."""
+        with self._lock:
+            return self.repeat_files - self.kept_files
+
+    def is_duplicate(self, message_index) -> bool:
+        return message_index in self.duplicate_of
+
+    def stats(self):
+        with self._lock:
+            return {"keyed": len(self.canonical) + len(self.duplicate_of), "duplicates": len(self.duplicate_of)}
+
+
+def main():
+    from ingest import load_messages
+
+    parser = argparse.ArgumentParser(description="Report duplicate trade posts in the buffers")
+    parser.add_argument("--buffers", type=Path, default=Path(__file__).parent / "buffers")
+    parser.add_argument("--media", type=Path, default=Path(__file__).parent / "media")
+    parser.add_argument("--show", type=int, default=10)
+    args = parser.parse_args()
+
+    messages = load_messages(args.buffers)
+    s = perf_counter()
+    index = TradeIndex(args.media)
+    index.add(messages)
+    stats = index.stats()
+    print(f"{len(messages)} messages, {stats['keyed']} keyed, {stats['duplicates']} duplicate posts ({perf_counter() - s:.2f}s)")
+
+    for first, copies in Counter(index.duplicate_of.values()).most_common(args.show):
+        print(f"  {messages[first][2][0]}: {copies} more post(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
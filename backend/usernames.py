@@ -0,0 +1,172 @@
+import sys
+import argparse
+from pathlib import Path
+from collections import Counter
+from time import perf_counter
+
+from decoding import decode_messages, is_valid_roblox_name
+
+# OCR mixes these up in screenshot text; names are already lowercased
+CONFUSABLE = str.maketrans({"i": "l", "1": "l", "|": "l", "!": "l", "0": "o"})
+
+# Longer decoded values are sentences, not names; keep them out of the tree
+MAX_NAME_LENGTH = 32
+
+
+def plausible(name) -> bool:
+    return bool(name) and len(name) <= MAX_NAME_LENGTH and not any(c.isspace() for c in name)
+
+
+def fold(name: str) -> str:
+    """Maps every I/l/1 and 0/O variant of a name onto one key."""
+    return name.lower().translate(CONFUSABLE)
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """Edit distance, or `limit + 1` as soon as it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    if len(a) < len(b): a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit: return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def deletes(word, depth):
+    """`word` plus every string reachable from it by up to `depth` deletions."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class UsernameIndex:
+    """Every sender/receiver name seen, snapped to its most likely spelling.
+
+    Names sharing a folded key are OCR variants of each other; the canonical
+    spelling is the best-attested valid one. Unknown names are matched to the
+    nearest folded key within `max_distance` edits. Candidates come from a
+    symmetric-delete index (any two strings within k edits share a string
+    reachable from both by k deletions), which answers in a handful of dict
+    lookups where a BK-tree over pure-Python edit distance took milliseconds.
+    """
+
+    def __init__(self, max_distance=1):
+        self.max_distance = max_distance
+        self.groups = {}    # folded key -> Counter(spelling -> weight)
+        self.deletes = {}   # deletion variant -> {folded keys}
+        self._best = {}     # folded key -> canonical spelling (cache)
+        self._snapped = {}  # name -> snapped name (cache)
+
+    def add(self, name, weight=1):
+        if not plausible(name): return
+        name = name.lower()
+        key = fold(name)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = Counter()
+            for variant in deletes(key, self.max_distance):
+                self.deletes.setdefault(variant, set()).add(key)
+        group[name] += weight
+        self._best.pop(key, None)
+        if self._snapped: self._snapped.clear()
+
+    def canonical(self, key):
+        best = self._best.get(key)
+        if best is None:
+            group = self.groups[key]
+            best = max(group, key=lambda n: (is_valid_roblox_name(n)[0], group[n], n))
+            self._best[key] = best
+        return best
+
+    def snap(self, name):
+        """Most likely canonical spelling of `name`, or `name` if nothing is close."""
+        if not plausible(name): return name
+        snapped = self._snapped.get(name)
+        if snapped is not None: return snapped
+
+        key = fold(name)
+        if key in self.groups:
+            snapped = self.canonical(key)
+        else:
+            matches = self.search(key)
+            if matches:
+                _, nearest = min(matches, key=lambda m: (m[0], -sum(self.groups[m[1]].values()), m[1]))
+                snapped = self.canonical(nearest)
+            else:
+                snapped = name.lower()
+        self._snapped[name] = snapped
+        return snapped
+
+    def search(self, key):
+        """[(distance, folded key)] for indexed keys within `max_distance` of `key`."""
+        candidates = set()
+        for variant in deletes(key, self.max_distance):
+            candidates |= self.deletes.get(variant, set())
+        found = []
+        for candidate in candidates:
+            d = levenshtein(key, candidate, self.max_distance)
+            if d <= self.max_distance: found.append((d, candidate))
+        return found
+
+    def snap_all(self, names):
+        return [self.snap(name) for name in names]
+
+    def snap_messages(self, messages, decoded=None):
+        """Decoded infos for `messages` with sender/receiver snapped."""
+        infos = decoded if decoded is not None else decode_messages(messages)
+        for info in infos:
+            info["sender"] = self.snap(info["sender"])
+            info["receiver"] = self.snap(info["receiver"])
+        return infos
+
+
+def build_index(messages, store=None, max_distance=1, decoded=None):
+    """Indexes the names in `messages`; ones on accepted trades count double."""
+    accepted = {row["filename"] for row in store.iter("accepted")} if store else set()
+    index = UsernameIndex(max_distance)
+    infos = decoded if decoded is not None else decode_messages(messages)
+    for message, info in zip(messages, infos):
+        weight = 2 if any(f in accepted for f in message[2]) else 1
+        index.add(info["sender"], weight)
+        index.add(info["receiver"], weight)
+    return index
+
+
+def main():
+    from ingest import load_messages
+    from annotation_store import AnnotationStore
+
+    parser = argparse.ArgumentParser(description="Build the username index and snap every decoded name")
+    parser.add_argument("--buffers", type=Path, default=Path(__file__).parent / "buffers")
+    parser.add_argument("--max-distance", type=int, default=1)
+    parser.add_argument("--show", type=int, default=20, help="print this many corrections")
+    args = parser.parse_args()
+
+    messages = load_messages(args.buffers)
+    decoded = decode_messages(messages)
+    s = perf_counter()
+    index = build_index(messages, AnnotationStore(), args.max_distance, decoded=decoded)
+    print(f"Indexed {sum(len(g) for g in index.groups.values())} spellings in {len(index.groups)} groups ({perf_counter() - s:.2f}s)")
+
+    names = [n for info in decoded for n in (info["sender"], info["receiver"]) if n]
+    s = perf_counter()
+    snapped = index.snap_all(names)
+    elapsed = perf_counter() - s
+    print(f"Snapped {len(names)} names in {elapsed:.3f}s ({elapsed / max(len(names), 1) * 1e6:.1f}us each)")
+
+    corrections = Counter((a, b) for a, b in zip(names, snapped) if a != b)
+    print(f"{sum(corrections.values())} names corrected ({len(corrections)} distinct)")
+    for (a, b), count in corrections.most_common(args.show):
+        print(f"  {a} -> {b} ({count}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,68 +1,51 @@
-import json
 import plotly.graph_objects as go
 import numpy as np
 from pathlib import Path
-from collections import Counter
 import webbrowser
-import os
+from annotation_store import AnnotationStore
+from ingest import load_messages
+from trade_index import TradeIndex
+from dataset import Dataset, export
+from discovery import history_from_items, LABELS, COLORS
 
 # --- Configuration ---
-directory = Path("backend/annotated")
+store = AnnotationStore()
 output_html = "trade_analytics_chronological.html"
+BUFFERS_DIR = Path("backend/buffers")
+MEDIA_DIR = Path("backend/media")
 
 # --- 1. Setup ---
-# Sorting by modification time (st_mtime) to ensure chronological order
-json_files = [f for f in directory.rglob("*.json") if f.stat().st_size > 0]
-json_files.sort(key=lambda x: os.path.getmtime(x))
+# Append whatever was decided since the last run, then work on the columns
+export(store)
+store.close()
+dataset = Dataset()
 
-running_item_counts = Counter() 
-
-milestone_labels = ["Seen 1x", "Seen 2-5x", "Seen 6-20x", "Seen 21-100x", "Seen 101+x"]
-milestone_colors = ["#2c3e50", "#34495e", "#5d6d7e", "#85929e", "#aeb6bf"]
-history = {label: [] for label in milestone_labels}
-
-def get_bin(count):
-    if count == 1: return "Seen 1x"
-    if 2 <= count <= 5: return "Seen 2-5x"
-    if 6 <= count <= 20: return "Seen 6-20x"
-    if 21 <= count <= 100: return "Seen 21-100x"
-    return "Seen 101+x"
+# Each trade counts once: skip repeat posts and decisions copied onto reposts
+# Matched by filename: the dataset's message_index is the server's, which may
+# not line up with a fresh load of the buffers
+trades = TradeIndex(MEDIA_DIR)
+trades.add(load_messages(BUFFERS_DIR))
+duplicates = trades.duplicate_filenames()
+rows = dataset.accepted(skip_duplicates=True)
+rows = rows[np.array([dataset.filenames[row] not in duplicates for row in rows], dtype=bool)]
 
 # --- 2. Process Trades ---
-valid_trade_count = 0
-for file in json_files:
-    try:
-        with open(file, 'r') as f:
-            data = json.load(f)
-        
-        current_trade_uniques = set()
-        for side in ['incoming', 'outgoing']:
-            items_list = data.get(side, {}).get('items', [])
-            for item in items_list:
-                iid = item.get('id')
-                if iid is not None:
-                    current_trade_uniques.add(iid)
-        
-        for iid in current_trade_uniques:
-            running_item_counts[iid] += 1
-            
-        current_snapshot = Counter()
-        for iid, count_at_this_time in running_item_counts.items():
-            current_snapshot[get_bin(count_at_this_time)] += 1
-            
-        for label in milestone_labels:
-            history[label].append(current_snapshot[label])
-            
-        valid_trade_count += 1
-    except:
-        continue
+# Rows are in annotation order, which keeps the chronological order
+position = np.full(len(dataset), -1, dtype=np.int64)
+position[rows] = np.arange(len(rows))
+trade_of = position[dataset.items["trade"]]
+kept = trade_of >= 0
+
+valid_trade_count = len(rows)
+counts = history_from_items(trade_of[kept], dataset.items["item"][kept], valid_trade_count)
+history = {label: counts[:, k] for k, label in enumerate(LABELS)}
 
 # --- 3. Plotting ---
 if valid_trade_count > 0:
     fig = go.Figure()
     x_axis = list(range(1, valid_trade_count + 1))
 
-    for label, color in zip(milestone_labels, milestone_colors):
+    for label, color in zip(LABELS, COLORS):
         fig.add_trace(go.Scatter(
             x=x_axis, 
             y=history[label],
@@ -75,7 +58,7 @@ if valid_trade_count > 0:
         ))
 
     fig.update_layout(
-        title=dict(text="CHRONOLOGICAL ITEM DISCOVERY (BY FILE MODIFIED DATE)", font=dict(color="#85929e"), x=0.02),
+        title=dict(text="CHRONOLOGICAL ITEM DISCOVERY (BY ANNOTATION TIME)", font=dict(color="#85929e"), x=0.02),
         xaxis=dict(title="TRADES (Oldest to Newest)", gridcolor="#1a1a1a", zeroline=False),
         yaxis=dict(title="UNIQUE ITEMS DISCOVERED", gridcolor="#1a1a1a", zeroline=False),
         hovermode="x unified",
@@ -95,4 +78,4 @@ if valid_trade_count > 0:
         f.write(html_content)
     
     webbrowser.open(f"file://{Path(output_html).absolute()}")
-    print(f"✅ Chronological Graph generated based on file history.")
\ No newline at end of file
+    print(f"✅ Chronological Graph generated based on annotation history.")
\ No newline at end of file
@@ -1,9 +1,11 @@
-import json
 import plotly.graph_objects as go
 from pathlib import Path
-from collections import Counter
 from tqdm import tqdm  # Progress bar library
-import proofreader 
+from ingest import load_messages
+from corpus_pipeline import CorpusPipeline, load_item_sets
+from phash import PerceptualIndex
+from trade_index import TradeIndex
+from discovery import DiscoveryHistogram, LABELS, COLORS
 
 # --- Setup Paths ---
 BUFFERS_DIR = Path("backend/buffers")
@@ -11,68 +13,31 @@ MEDIA_DIR = Path("backend/media")
 
 def generate_live_memory_graph():
     # 1. Load Messages
-    messages = []
-    if BUFFERS_DIR.exists():
-        buffer_files = sorted(BUFFERS_DIR.glob("*.json"), key=lambda p: int(p.stem) if p.stem.isdigit() else 0)
-        for file_path in buffer_files:
-            with open(file_path, "r") as f:
-                messages += json.load(f)
+    messages = load_messages(BUFFERS_DIR)
 
     if not messages:
         print("No messages found in buffers.")
         return
 
-    # 2. Data Structures
-    running_item_counts = Counter()
-    milestone_labels = ["Seen 1x", "Seen 2-5x", "Seen 6-20x", "Seen 21-100x", "Seen 101+x"]
-    milestone_colors = ["#2c3e50", "#34495e", "#5d6d7e", "#85929e", "#aeb6bf"]
-    history = {label: [] for label in milestone_labels}
+    # 2. Extract item sets, resuming from the last checkpoint
+    # Repeat posts of a trade are counted once; reposted screenshots reuse
+    # the items of their first copy instead of re-running CV
+    duplicates = TradeIndex(MEDIA_DIR).add(messages)
+    pipeline = CorpusPipeline(MEDIA_DIR, phash=PerceptualIndex(MEDIA_DIR))
 
-    def get_bin(count):
-        if count == 1: return "Seen 1x"
-        if 2 <= count <= 5: return "Seen 2-5x"
-        if 6 <= count <= 20: return "Seen 6-20x"
-        if 21 <= count <= 100: return "Seen 21-100x"
-        return "Seen 101+x"
+    print("\n🚀 Starting CV Analysis...\n")
+    with tqdm(desc="Analyzing Trades", unit="trade") as bar:
+        def start(total):
+            bar.reset(total=total)
 
-    valid_trades_processed = 0
+        stats = pipeline.run(messages, on_start=start, on_record=lambda record: bar.update(), skip=duplicates)
+    print(f"{stats['done']} trades from checkpoint, {stats['extracted']} extracted, {stats['errors']} failed, {len(duplicates)} repeat posts skipped")
 
-    # 3. Process with Progress Bar
-    # tqdm wraps the list and prints a live bar to the console
-    print("\n🚀 Starting On-the-Fly CV Analysis...\n")
-    for msg in tqdm(messages, desc="Analyzing Trades", unit="trade"):
-        if not msg[2]: continue 
-        
-        filename = msg[2][0]
-        img_path = MEDIA_DIR / filename
-        
-        if not img_path.exists(): continue
+    # 3. Data Structures
+    histogram = DiscoveryHistogram().add_trades(load_item_sets(pipeline.path, pipeline.version, skip=duplicates, messages=messages))
 
-        try:
-            # Memory-only CV call
-            trade_data = proofreader.get_trade_data(str(img_path))
-            
-            current_trade_uniques = set()
-            for side in ['incoming', 'outgoing']:
-                items = trade_data.get(side, {}).get('items', [])
-                for item in items:
-                    iid = item.get('id')
-                    if iid: current_trade_uniques.add(iid)
-            
-            for iid in current_trade_uniques:
-                running_item_counts[iid] += 1
-            
-            snapshot = Counter()
-            for iid, count in running_item_counts.items():
-                snapshot[get_bin(count)] += 1
-            
-            for label in milestone_labels:
-                history[label].append(snapshot[label])
-                
-            valid_trades_processed += 1
-            
-        except Exception:
-            continue
+    valid_trades_processed = histogram.trades
+    history = histogram.series()
 
     if valid_trades_processed == 0:
         print("\n❌ No valid trade data extracted.")
@@ -82,7 +47,7 @@ def generate_live_memory_graph():
     fig = go.Figure()
     x_axis = list(range(1, valid_trades_processed + 1))
 
-    for label, color in zip(milestone_labels, milestone_colors):
+    for label, color in zip(LABELS, COLORS):
         fig.add_trace(go.Scatter(
             x=x_axis, y=history[label],
             mode='lines',
@@ -2,6 +2,30 @@ import React, { useState, useEffect, useCallback, useRef } from 'react';
 import './App.css';
 
 const API_URL = 'http://localhost:8000';
+const BUFFER_SIZE = 3;
+// Failed decision submissions are retried with exponential backoff, this many times in a row
+const SUBMIT_RETRIES = 5;
+const SUBMIT_BACKOFF_MS = 1000;
+
+// One id per tab: the server leases the trades it hands out to this id
+const CLIENT_ID = sessionStorage.getItem('veto-client-id') || crypto.randomUUID();
+sessionStorage.setItem('veto-client-id', CLIENT_ID);
+
+// Resized WEBP copies from /next, so the browser fetches the smallest that fits the viewer
+const previewSrcSet = (trade) =>
+  trade.previews?.length
+    ? trade.previews.map(p => `${API_URL}${p.url} ${p.width}w`).join(', ')
+    : undefined;
+
+// Fetch and decode a buffered trade's screenshot before it reaches the viewer
+const preloadImage = (trade) => {
+  const img = new Image();
+  img.sizes = '55vw';
+  const srcSet = previewSrcSet(trade);
+  if (srcSet) img.srcset = srcSet;
+  img.src = `${API_URL}/media/${trade.filename}`;
+  img.decode?.().catch(() => {});
+};
 
 function App() {
   const [currentTrade, setCurrentTrade] = useState(null);
@@ -11,6 +35,12 @@ function App() {
   // The Mutex Lock: Prevents the "Infinite Request Loop"
   const isFetching = useRef(false);
 
+  // Decisions made while a submission is in flight go out together in the next one
+  const pendingActions = useRef([]);
+  const isSubmitting = useRef(false);
+  const submitFailures = useRef(0);
+  const retryTimer = useRef(null);
+
   const syncStats = async () => {
     try {
       const res = await fetch(`${API_URL}/stats`);
@@ -23,7 +53,7 @@ function App() {
 
   const refillBuffer = useCallback(async () => {
     // Only fetch if we aren't already fetching and buffer isn't full
-    if (isFetching.current || buffer.length >= 3) return;
+    if (isFetching.current || buffer.length >= BUFFER_SIZE) return;
     isFetching.current = true;
 
     try {
@@ -32,11 +62,13 @@ function App() {
       if (currentTrade) exclude.push(currentTrade.filename);
       
       const query = exclude.map(f => `exclude=${encodeURIComponent(f)}`).join('&');
-      const res = await fetch(`${API_URL}/next?${query}`);
+      const count = BUFFER_SIZE - buffer.length;
+      const res = await fetch(`${API_URL}/next?count=${count}&client=${CLIENT_ID}&${query}`);
       
       if (res.ok) {
         const data = await res.json();
-        if (data) setBuffer(prev => [...prev, data]);
+        data.forEach(preloadImage);
+        if (data.length) setBuffer(prev => [...prev, ...data]);
       }
     } catch (e) {
       console.error("Buffer refill failed", e);
@@ -45,9 +77,13 @@ function App() {
     }
   }, [buffer, currentTrade]);
 
-  // Initial load and monitoring
+  // Initial load; after that stats come back with each /actions response
   useEffect(() => {
     syncStats();
+  }, []);
+
+  // Monitoring
+  useEffect(() => {
     refillBuffer();
   }, [refillBuffer]);
 
@@ -59,28 +95,85 @@ function App() {
     }
   }, [currentTrade, buffer]);
 
-  const handleAction = async (action) => {
-    if (!currentTrade) return;
-    const target = currentTrade;
-    
-    // Optimistic UI: Clear immediately so next item pops in
-    setCurrentTrade(null);
+  // A 4xx on /actions rejects the whole list; resend one by one so only the bad item is dropped
+  const submitEach = async (batch) => {
+    const retry = [];
+    for (const action of batch) {
+      try {
+        const res = await fetch(`${API_URL}/action`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(action)
+        });
+        if (res.status >= 400 && res.status < 500) console.error("Action rejected by server", action, res.status);
+        else if (!res.ok) retry.push(action);
+      } catch (e) {
+        retry.push(action);
+      }
+    }
+    return retry;
+  };
+
+  const submitActions = async () => {
+    if (isSubmitting.current || pendingActions.current.length === 0) return;
+    isSubmitting.current = true;
+    clearTimeout(retryTimer.current);
 
+    const batch = pendingActions.current;
+    pendingActions.current = [];
+
+    let failed = batch;
     try {
-      await fetch(`${API_URL}/action`, {
+      const res = await fetch(`${API_URL}/actions`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          filename: target.filename,
-          message_index: target.message_index,
-          action: action,
-          metadata: target.metadata
-        })
+        body: JSON.stringify(batch)
       });
-      syncStats();
+      if (res.ok) {
+        const data = await res.json();
+        setStats(data.stats);
+        failed = [];
+      } else if (res.status >= 400 && res.status < 500) {
+        failed = await submitEach(batch);
+        if (failed.length < batch.length) syncStats();
+      }
     } catch (e) {
       console.error("Action submission failed", e);
     }
+
+    isSubmitting.current = false;
+    if (failed.length) {
+      // Back at the front, ahead of anything decided meanwhile
+      pendingActions.current = [...failed, ...pendingActions.current];
+      submitFailures.current += 1;
+      if (submitFailures.current <= SUBMIT_RETRIES) {
+        const delay = SUBMIT_BACKOFF_MS * 2 ** (submitFailures.current - 1);
+        retryTimer.current = setTimeout(submitActions, delay);
+      } else {
+        // Kept queued; the next decision tries again
+        console.error(`Giving up retrying ${pendingActions.current.length} decisions for now`);
+      }
+      return;
+    }
+    submitFailures.current = 0;
+    submitActions();
+  };
+
+  const handleAction = (action) => {
+    if (!currentTrade) return;
+    const target = currentTrade;
+    
+    // Optimistic UI: Clear immediately so next item pops in
+    setCurrentTrade(null);
+
+    pendingActions.current.push({
+      filename: target.filename,
+      message_index: target.message_index,
+      action: action,
+      metadata: target.metadata
+    });
+    if (submitFailures.current > SUBMIT_RETRIES) submitFailures.current = 0;
+    submitActions();
   };
 
   // Keyboard Listeners
@@ -114,6 +207,8 @@ function App() {
           {currentTrade && (
             <img 
               src={`${API_URL}/media/${currentTrade.filename}`} 
+              srcSet={previewSrcSet(currentTrade)}
+              sizes="55vw"
               alt="Trade Proof" 
             />
           )}